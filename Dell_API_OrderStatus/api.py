@@ -0,0 +1,128 @@
+import json
+import gzip
+import base64
+import binascii
+
+from flask import Blueprint, request, jsonify, make_response
+
+import config
+import database
+
+# 핸드헬드 스캐너/대시보드용 JSON 조회 API. HTML 조회 화면과 같은 필터를 사용합니다.
+api_bp = Blueprint('api', __name__, url_prefix='/api')
+
+SEARCHABLE_FIELDS = ('purchase_order_number', 'order_number', 'product_description')
+HEADER_FIELDS = ('order_number', 'purchase_order_number', 'created_at', 'shipped', 'memo', 'box', 'pending')
+ALL_FIELDS = HEADER_FIELDS + ('products',)
+MAX_PAGE_SIZE = 200
+# 이보다 작은 응답은 압축 이득보다 비용이 커서 그대로 보냅니다.
+GZIP_MIN_BYTES = 1024
+
+def _encode_cursor(key):
+    raw = json.dumps(key).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def _decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        raise ValueError("잘못된 cursor 값입니다.")
+    if not isinstance(key, str):
+        raise ValueError("잘못된 cursor 값입니다.")
+    return key
+
+def _build_filters(args):
+    """쿼리 인자로 WHERE 절과 파라미터를 만듭니다. /search, /search_shipped, /search_unshipped, /order_list와 같은 조건입니다."""
+    conditions, params = [], []
+
+    field, value = args.get('field'), args.get('value')
+    if field or value:
+        if field not in SEARCHABLE_FIELDS or not value:
+            raise ValueError(f"field는 {', '.join(SEARCHABLE_FIELDS)} 중 하나여야 하며 value가 필요합니다.")
+        conditions.append(f"{field} LIKE ?")
+        params.append(f"%{value}%")
+
+    shipped = args.get('shipped')
+    if shipped is not None:
+        if shipped not in ('true', 'false'):
+            raise ValueError("shipped는 true 또는 false여야 합니다.")
+        conditions.append("shipped = ?")
+        params.append(1 if shipped == 'true' else 0)
+
+    start_date, end_date = args.get('start_date'), args.get('end_date')
+    if start_date or end_date:
+        if not (start_date and end_date):
+            raise ValueError("start_date와 end_date를 함께 지정해야 합니다.")
+        conditions.append("DATE(created_at) BETWEEN DATE(?) AND DATE(?)")
+        params += [start_date, end_date]
+
+    query = "WHERE " + " AND ".join(conditions) if conditions else ""
+    return query, params
+
+def _needs_archive(args):
+    """
+    보관 DB에는 ARCHIVE_AFTER_DAYS보다 오래된 출고 주문만 있으므로, 검색이나 오래된 날짜 범위,
+    출고 주문을 포함할 수 있는 전체 조회일 때만 함께 조회합니다.
+    """
+    if args.get('field'):
+        return True
+    if args.get('start_date'):
+        return database.range_needs_archive(args['start_date'])
+    return args.get('shipped') != 'false'
+
+def _parse_fields(fields_arg):
+    """fields=header 또는 fields=order_number,products 처럼 필요한 필드만 선택합니다."""
+    if not fields_arg:
+        return ALL_FIELDS
+    if fields_arg == 'header':
+        return HEADER_FIELDS
+    fields = tuple(f.strip() for f in fields_arg.split(',') if f.strip())
+    unknown = [f for f in fields if f not in ALL_FIELDS]
+    if unknown:
+        raise ValueError(f"알 수 없는 필드: {', '.join(unknown)}")
+    return fields
+
+def _json_response(payload, status=200):
+    """JSON 응답을 만들고, 클라이언트가 지원하면 gzip으로 압축합니다."""
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    response = make_response(body, status)
+    response.headers['Content-Type'] = 'application/json; charset=utf-8'
+    response.headers['Vary'] = 'Accept-Encoding'
+    if len(body) >= GZIP_MIN_BYTES and 'gzip' in request.accept_encodings:
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+@api_bp.route('/orders', methods=['GET'])
+def list_orders():
+    """
+    주문 목록을 최신순으로 반환합니다.
+
+    쿼리 인자:
+      field, value         - 검색 (purchase_order_number / order_number / product_description)
+      shipped              - true / false
+      start_date, end_date - 입고 날짜 범위 (YYYY-MM-DD)
+      fields               - 'header' 또는 쉼표로 구분한 필드 목록 (기본: 전체, products 포함)
+      limit                - 페이지 크기 (기본 ITEMS_PER_PAGE, 최대 200)
+      cursor               - 이전 응답의 next_cursor
+    """
+    try:
+        query, params = _build_filters(request.args)
+        fields = _parse_fields(request.args.get('fields'))
+        limit = request.args.get('limit', str(config.ITEMS_PER_PAGE))
+        if not limit.isdigit() or not 1 <= int(limit) <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit은 1~{MAX_PAGE_SIZE} 사이여야 합니다.")
+        cursor = request.args.get('cursor')
+        after = _decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    orders, next_key = database.get_order_page(
+        query, params, after=after, limit=int(limit), include_archive=_needs_archive(request.args),
+        with_products='products' in fields
+    )
+    return _json_response({
+        "orders": [{field: order[field] for field in fields} for order in orders],
+        "next_cursor": _encode_cursor(next_key) if next_key else None,
+    })
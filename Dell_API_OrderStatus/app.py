@@ -1,33 +1,58 @@
-from flask import Flask, request, jsonify, render_template, redirect, url_for, session, flash
+from flask import Flask, Blueprint, current_app, request, jsonify, render_template, redirect, url_for, session
 from werkzeug.utils import secure_filename
 import os
+import time
+import sqlite3
 import datetime
 import logging
-import smtplib
-from email.mime.text import MIMEText
 
+import api
+import archive
+import barcode_reader
 import config
 import database
 import dell_api
+import logging_setup
+import migrations
+import notifier
 import ocr
+import page_cache
+import profiler
+import rate_limit
+import reconcile
 
 # --- App Setup ---
-app = Flask(__name__)
-app.config.from_object(config)
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+# 라우트는 Blueprint에 등록하고, 앱 객체는 create_app()에서 생성합니다.
+# 이렇게 하면 WSGI 서버가 fork한 각 워커 프로세스에서 앱을 새로 만들 수 있습니다.
+bp = Blueprint('orders', __name__)
+
+# 마지막 토큰 발급 실패 시각 (워커 프로세스별). 실패 직후에는 토큰 요청 없이 바로 오프라인 접수합니다.
+_token_failed_at = 0.0
 
 # --- Helper Functions ---
 
 def _get_api_token():
     """Wrapper to get API token and handle failure gracefully."""
+    global _token_failed_at
+    if time.time() - _token_failed_at < config.TOKEN_FAILURE_COOLDOWN_SECONDS:
+        logging.warning("Dell API token failed recently; capturing orders for later lookup.")
+        return None
     try:
         return dell_api.get_access_token()
+    except dell_api.TokenRateLimited as e:
+        # 토큰 서버가 실패한 것이 아니라 요청이 몰린 것이므로, 이 요청만 오프라인 접수하고 쿨다운은 걸지 않습니다.
+        logging.warning(f"Dell API token request rate limited; capturing orders for later lookup: {e}")
+        return None
     except dell_api.TokenError as e:
+        _token_failed_at = time.time()
         logging.error(f"Fatal: Could not obtain Dell API token. API lookups will fail. Error: {e}")
         return None
 
-def _process_manual_orders(manual_order_numbers, boxes, token):
-    """Helper function to process manually entered order numbers."""
+def _process_manual_orders(manual_order_numbers, boxes, token, capture_reason):
+    """
+    Helper function to process manually entered order numbers.
+    토큰이 없거나 조회에 실패한 주문은 Dell 조회 대기 주문(pending)으로 반환됩니다.
+    """
     collected_data = []
     for i, manual_order_number in enumerate(manual_order_numbers):
         if not manual_order_number.strip():
@@ -37,8 +62,7 @@ def _process_manual_orders(manual_order_numbers, boxes, token):
         logging.info(f"Processing manual order: {manual_order_number}")
 
         if not token:
-            order_details = {"purchase_order_number": "API 토큰 실패", "order_number": manual_order_number, "products": [], "box": box_value}
-            collected_data.append(order_details)
+            collected_data.append(reconcile.pending_order_details(manual_order_number, box_value, capture_reason))
             continue
         try:
             order_data = dell_api.fetch_order_data([manual_order_number], token)
@@ -48,8 +72,7 @@ def _process_manual_orders(manual_order_numbers, boxes, token):
             logging.info(f"✅ Successfully processed manual order: {manual_order_number}")
         except dell_api.OrderFetchError as e:
             logging.error(f"❌ Dell API error for manual order {manual_order_number}: {e}")
-            order_details = {"purchase_order_number": "API 조회 실패", "order_number": manual_order_number, "products": [], "box": box_value}
-            collected_data.append(order_details)
+            collected_data.append(reconcile.pending_order_details(manual_order_number, box_value, "lookup_failed"))
         except Exception as e:
             logging.error(f"❌ Unexpected error for manual order {manual_order_number}: {e}", exc_info=True)
             order_details = {"purchase_order_number": "알 수 없는 오류", "order_number": manual_order_number, "products": [], "box": box_value}
@@ -57,58 +80,86 @@ def _process_manual_orders(manual_order_numbers, boxes, token):
             
     return collected_data
 
-def _process_uploaded_files(files, token):
-    """Helper function to process uploaded image files. Returns data and errors."""
-    collected_data = []
+def _merge_box_results(ocr_results):
+    """
+    OCR 결과를 주문 번호별로 묶습니다. 한 주문의 여러 박스 라벨("1 of 3", "2 of 3" ...)은 하나로 합쳐지고,
+    인식된 박스 순번과 전체 박스 수를 비교해 누락된 박스 번호를 계산합니다.
+    전체 박스 수는 순번이 있는 라벨('X of Y', X <= Y <= MAX_BOXES_PER_ORDER)에서만 가져옵니다.
+    """
+    merged = {}
+    for result in ocr_results:
+        order_number = result["order_number"]
+        entry = merged.setdefault(order_number, {"order_number": order_number, "box": None, "total": None,
+                                                 "boxes_seen": set(), "box_unknown": False})
+        # 바코드로 주문 번호만 읽고 박스를 알 수 없는 사진
+        entry["box_unknown"] = entry["box_unknown"] or bool(result.get("box_unknown"))
+
+        box, box_index = result.get("box"), result.get("box_index")
+        if box_index is None:
+            # 순번 없는 값('Box 3', 수동 입력 등)은 표시용으로만 쓰고 누락 계산에는 쓰지 않습니다.
+            if entry["box"] is None:
+                entry["box"] = box
+            continue
+
+        total = int(box) if box is not None and str(box).isdigit() else None
+        if total is None or not 1 <= int(box_index) <= total <= config.MAX_BOXES_PER_ORDER:
+            # '10/2024' 같은 날짜를 'X of Y'로 잘못 읽은 경우 등
+            logging.warning(f"Ignoring implausible box label {box_index} of {box} for order {order_number}")
+            continue
+        entry["boxes_seen"].add(int(box_index))
+        entry["total"] = max(entry["total"] or 0, total)
+
+    for entry in merged.values():
+        total = entry.pop("total")
+        if total is not None:
+            entry["box"] = total
+        seen = sorted(entry["boxes_seen"])
+        entry["boxes_seen"] = seen
+        entry["missing_boxes"] = [n for n in range(1, total + 1) if n not in seen] if total else []
+        entry["box_unknown"] = entry["box_unknown"] and entry["box"] is None
+    return list(merged.values())
+
+def _process_uploaded_files(files, token, capture_reason):
+    """
+    Helper function to process uploaded image/PDF files. Returns data and errors.
+    토큰이 없거나 조회에 실패한 주문은 Dell 조회 대기 주문(pending)으로 반환됩니다.
+    """
+    ocr_results = []
     errors = []
 
+    # --- 1단계: 모든 파일 OCR ---
     for file in files:
         if not file or not file.filename:
             continue
 
         filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
 
         try:
             file.save(file_path)
             logging.info(f"Processing file: {filename}")
-            
-            ocr_results = ocr.extract_order_details_from_image(file_path)
 
-            if not ocr_results:
+            if filename.lower().endswith('.pdf'):
+                file_results = ocr.extract_order_details_from_pdf(file_path)
+            else:
+                file_results = ocr.extract_order_details_from_image(file_path)
+
+            if not file_results:
                 logging.error(f"❌ OCR did not find any order numbers in {filename}")
                 errors.append(f"'{filename}'에서 주문 번호를 찾지 못했습니다. 이미지를 확인 후 다시 시도하거나 수동으로 입력해주세요.")
                 continue
 
-            for ocr_result in ocr_results:
+            for ocr_result in file_results:
                 if ocr_result.get("error"):
                     error_msg = ocr_result.get("error")
                     logging.error(f"❌ OCR failed for {filename}: {error_msg}")
                     errors.append(f"'{filename}' 이미지 처리 실패: {error_msg}")
-                    continue
-
-                order_number = ocr_result.get("order_number")
-                box = ocr_result.get("box", "N/A")
-
-                if order_number:
-                    logging.info(f"✅ OCR successful for {filename}. Order: {order_number}. Querying Dell API...")
-                    if not token:
-                        order_details = {"purchase_order_number": "API 토큰 실패", "order_number": order_number, "products": [], "box": box}
-                    else:
-                        try:
-                            order_data = dell_api.fetch_order_data([order_number], token)
-                            order_details = dell_api.extract_order_details(order_number, order_data)
-                            order_details["box"] = box
-                            logging.info(f"✅ Dell API query successful for order: {order_number}")
-                        except dell_api.OrderFetchError as e:
-                            logging.error(f"❌ Dell API error for {filename} (Order: {order_number}): {e}")
-                            order_details = {"purchase_order_number": "API 조회 실패", "order_number": order_number, "products": [], "box": box}
-                    collected_data.append(order_details)
+                elif ocr_result.get("order_number"):
+                    logging.info(f"✅ OCR successful for {filename}. Order: {ocr_result['order_number']}")
+                    ocr_results.append(ocr_result)
                 else:
                     # This case handles if a result in the list is missing an order number
                     logging.warning(f"⚠️ OCR result for {filename} is missing an order number.")
-                    # Optionally, add a less severe error message
-                    # errors.append(f"'{filename}'의 일부 항목에서 주문 번호를 찾지 못했습니다.")
 
         except Exception as e:
             logging.error(f"❌ Critical error processing file {filename}: {e}", exc_info=True)
@@ -117,49 +168,70 @@ def _process_uploaded_files(files, token):
             if os.path.exists(file_path):
                 os.remove(file_path)
 
+    # 파일 오류가 있으면 전체 요청이 실패 처리되므로 Dell API를 호출하지 않습니다.
+    if errors:
+        return [], errors
+
+    # --- 2단계: 주문 번호별로 박스 라벨 병합 ---
+    merged_orders = _merge_box_results(ocr_results)
+    logging.info(f"{len(ocr_results)} OCR result(s) merged into {len(merged_orders)} unique order(s).")
+
+    # --- 3단계: 주문마다 Dell API 한 번씩 조회 ---
+    collected_data = []
+    for merged in merged_orders:
+        order_number = merged["order_number"]
+        box = merged["box"]
+        if not token:
+            order_details = reconcile.pending_order_details(order_number, box, capture_reason)
+        else:
+            try:
+                order_data = dell_api.fetch_order_data([order_number], token)
+                order_details = dell_api.extract_order_details(order_number, order_data)
+                order_details["box"] = box
+                logging.info(f"✅ Dell API query successful for order: {order_number}")
+            except dell_api.OrderFetchError as e:
+                logging.error(f"❌ Dell API error for order {order_number}: {e}")
+                order_details = reconcile.pending_order_details(order_number, box, "lookup_failed")
+        order_details["boxes_seen"] = merged["boxes_seen"]
+        order_details["missing_boxes"] = merged["missing_boxes"]
+        order_details["box_unknown"] = merged["box_unknown"]
+        collected_data.append(order_details)
+
     return collected_data, errors
 
-def _group_orders(db_rows):
-    """Groups database rows by order_number and aggregates their products."""
-    grouped_orders = {}
-    for row in db_rows:
-        row_dict = dict(row)
-        order_num = row_dict['order_number']
-        
-        if order_num not in grouped_orders:
-            grouped_orders[order_num] = {
-                "order_number": order_num,
-                "purchase_order_number": row_dict['purchase_order_number'],
-                "created_at": row_dict['created_at'],
-                "shipped": row_dict['shipped'],
-                "memo": row_dict['memo'],
-                "box": row_dict['box'],
-                "products": []
-            }
-        
-        grouped_orders[order_num]['products'].append({
-            "description": row_dict['product_description'],
-            "itemQuantity": row_dict['quantity']
-        })
-        
-    return list(grouped_orders.values())
+def _paginate_orders(page, query="", params=(), include_archive=False):
+    """
+    검색 조건과 일치하는 주문 중 해당 페이지만 DB에서 그룹화해 가져오고, (주문 목록, 전체 페이지 수)를 반환합니다.
+    include_archive이면 보관 DB로 옮겨진 오래된 출고 주문도 포함합니다.
+    """
+    page = max(page, 1)
+    total_items = database.count_grouped_orders(query, params, include_archive=include_archive)
+    total_pages = (total_items + config.ITEMS_PER_PAGE - 1) // config.ITEMS_PER_PAGE if total_items > 0 else 1
+    paginated_orders = database.get_grouped_orders(
+        query, params, limit=config.ITEMS_PER_PAGE, offset=(page - 1) * config.ITEMS_PER_PAGE,
+        include_archive=include_archive
+    )
+    return paginated_orders, total_pages
 
 # --- Routes ---
 
-@app.route('/')
+@bp.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/product_scan.html')
+@bp.route('/product_scan.html')
 def product_scan():
     session.pop('collected_data', None)
     return render_template('product_scan.html')
 
-@app.route('/process_order', methods=['POST'])
+@bp.route('/process_order', methods=['POST'])
 def process_order():
     session.pop('collected_data', None)
     all_collected_data = []
-    token = _get_api_token()
+    # 오프라인 접수: Dell API를 기다리지 않고 주문 번호/박스만 먼저 저장하고, 조회는 백그라운드에서 합니다.
+    force_capture = config.OFFLINE_CAPTURE_FORCE or request.form.get('capture_mode') == '1'
+    token = None if force_capture else _get_api_token()
+    capture_reason = "forced" if force_capture else "token_unavailable"
 
     files = request.files.getlist('files[]')
     manual_order_numbers = request.form.getlist("manual_order_numbers[]")
@@ -171,7 +243,7 @@ def process_order():
 
     # --- Process Files ---
     if has_files:
-        file_data, file_errors = _process_uploaded_files(files, token)
+        file_data, file_errors = _process_uploaded_files(files, token, capture_reason)
         if file_errors:
             return jsonify({"status": "error", "errors": file_errors})
         all_collected_data.extend(file_data)
@@ -179,25 +251,33 @@ def process_order():
     # --- Process Manual Orders ---
     if has_manual_orders:
         boxes = request.form.getlist("box[]")
-        manual_data = _process_manual_orders(manual_order_numbers, boxes, token)
+        manual_data = _process_manual_orders(manual_order_numbers, boxes, token, capture_reason)
         all_collected_data.extend(manual_data)
     
     if not all_collected_data:
         return jsonify({"status": "error", "message": "처리할 데이터가 없습니다. 파일을 업로드하거나 주문 번호를 수동으로 입력하세요."}), 400
 
+    pending_orders = [order for order in all_collected_data if order.get("pending")]
+    if pending_orders:
+        try:
+            reconcile.capture_orders(pending_orders)
+        except sqlite3.Error as e:
+            logging.error(f"Failed to capture pending orders: {e}", exc_info=True)
+            return jsonify({"status": "error", "message": "주문 임시 저장에 실패했습니다. 잠시 후 다시 시도해주세요."}), 500
+
     session['collected_data'] = all_collected_data
     session.modified = True
     
-    return jsonify({"status": "success", "redirect_url": url_for('results_page')})
+    return jsonify({"status": "success", "redirect_url": url_for('orders.results_page')})
 
-@app.route('/results')
+@bp.route('/results')
 def results_page():
     orders = session.get('collected_data', [])
     if not orders:
         return render_template('result.html', message="처리된 데이터가 없습니다. 다시 시도해주세요.")
     return render_template('result.html', orders=orders)
 
-@app.route('/save_orders', methods=['POST'])
+@bp.route('/save_orders', methods=['POST'])
 def save_orders_route():
     orders = session.get('collected_data', [])
     if not orders:
@@ -205,8 +285,15 @@ def save_orders_route():
     
     saved_count = database.save_orders(orders)
     session.pop('collected_data', None)
-    
-    return jsonify({"message": f"{saved_count}개의 새로운 항목이 성공적으로 저장되었습니다."}), 200
+
+    # 오프라인 접수된 주문은 /process_order에서 이미 대기 행으로 저장되었으므로 save_orders가 건너뜁니다.
+    pending_count = sum(1 for order in orders if order.get('pending'))
+    messages = []
+    if saved_count or not pending_count:
+        messages.append(f"{saved_count}개의 새로운 항목이 성공적으로 저장되었습니다.")
+    if pending_count:
+        messages.append(f"Dell 조회 대기 주문 {pending_count}건은 접수 시 이미 저장되었으며, Dell API가 복구되면 제품 정보가 자동으로 채워집니다.")
+    return jsonify({"message": "\n".join(messages)}), 200
 
 def get_week_range(date_str):
     """Get the Sunday and Saturday of the week for a given date string."""
@@ -215,7 +302,8 @@ def get_week_range(date_str):
     end_of_week = start_of_week + datetime.timedelta(days=6)  # Saturday
     return start_of_week.strftime('%Y-%m-%d'), end_of_week.strftime('%Y-%m-%d')
 
-@app.route('/order_list', methods=['GET'])
+@bp.route('/order_list', methods=['GET'])
+@page_cache.conditional_page
 def order_list():
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
@@ -226,12 +314,11 @@ def order_list():
         # Set both start and end to the latest date to show only that day.
         start_date = latest_date
         end_date = latest_date
-        return redirect(url_for('order_list', start_date=start_date, end_date=end_date))
+        return redirect(url_for('orders.order_list', start_date=start_date, end_date=end_date))
 
-    # Fetch and group orders for the given date range.
+    # Fetch orders for the given date range, already grouped by the database.
     # Note: The search routes handle their own pagination. This route shows all items in the range.
-    db_orders = database.get_orders_by_date_range(start_date, end_date)
-    order_list = _group_orders(db_orders)
+    order_list = database.get_orders_by_date_range(start_date, end_date)
     
     return render_template(
         'product_list.html',
@@ -241,7 +328,8 @@ def order_list():
         available_dates=database.get_all_dates()
     )
 
-@app.route('/search', methods=['GET'])
+@bp.route('/search', methods=['GET'])
+@page_cache.conditional_page
 def search_orders():
     """Search orders by a specific field and value with pagination."""
     page = int(request.args.get('page', 1))
@@ -249,19 +337,12 @@ def search_orders():
     value = request.args.get('value')
     
     if not field or not value:
-        return redirect(url_for('search_all'))
+        return redirect(url_for('orders.search_all'))
 
     query = f"WHERE {field} LIKE ?"
     params = [f"%{value}%"]
     
-    all_orders_flat = database.get_all_orders_matching(query, params)
-    all_grouped_orders = _group_orders(all_orders_flat)
-    
-    total_items = len(all_grouped_orders)
-    total_pages = (total_items + config.ITEMS_PER_PAGE - 1) // config.ITEMS_PER_PAGE if total_items > 0 else 1
-    start_index = (page - 1) * config.ITEMS_PER_PAGE
-    end_index = start_index + config.ITEMS_PER_PAGE
-    paginated_orders = all_grouped_orders[start_index:end_index]
+    paginated_orders, total_pages = _paginate_orders(page, query, params, include_archive=True)
     
     return render_template(
         'product_list.html',
@@ -272,19 +353,13 @@ def search_orders():
         total_pages=total_pages
     )
 
-@app.route('/search_all', methods=['GET'])
+@bp.route('/search_all', methods=['GET'])
+@page_cache.conditional_page
 def search_all():
     """Retrieve all orders with pagination."""
     page = int(request.args.get('page', 1))
     
-    all_orders_flat = database.get_all_orders_matching()
-    all_grouped_orders = _group_orders(all_orders_flat)
-
-    total_items = len(all_grouped_orders)
-    total_pages = (total_items + config.ITEMS_PER_PAGE - 1) // config.ITEMS_PER_PAGE if total_items > 0 else 1
-    start_index = (page - 1) * config.ITEMS_PER_PAGE
-    end_index = start_index + config.ITEMS_PER_PAGE
-    paginated_orders = all_grouped_orders[start_index:end_index]
+    paginated_orders, total_pages = _paginate_orders(page, include_archive=True)
 
     return render_template(
         'product_list.html',
@@ -294,20 +369,14 @@ def search_all():
         total_pages=total_pages
     )
 
-@app.route('/search_unshipped', methods=['GET'])
+@bp.route('/search_unshipped', methods=['GET'])
+@page_cache.conditional_page
 def search_unshipped():
     """Retrieve all unshipped orders with pagination."""
     page = int(request.args.get('page', 1))
     query = "WHERE shipped = 0"
     
-    all_orders_flat = database.get_all_orders_matching(query)
-    all_grouped_orders = _group_orders(all_orders_flat)
-
-    total_items = len(all_grouped_orders)
-    total_pages = (total_items + config.ITEMS_PER_PAGE - 1) // config.ITEMS_PER_PAGE if total_items > 0 else 1
-    start_index = (page - 1) * config.ITEMS_PER_PAGE
-    end_index = start_index + config.ITEMS_PER_PAGE
-    paginated_orders = all_grouped_orders[start_index:end_index]
+    paginated_orders, total_pages = _paginate_orders(page, query)
 
     return render_template(
         'product_list.html',
@@ -317,20 +386,14 @@ def search_unshipped():
         total_pages=total_pages
     )
 
-@app.route('/search_shipped', methods=['GET'])
+@bp.route('/search_shipped', methods=['GET'])
+@page_cache.conditional_page
 def search_shipped():
     """Retrieve all shipped orders with pagination."""
     page = int(request.args.get('page', 1))
     query = "WHERE shipped = 1"
 
-    all_orders_flat = database.get_all_orders_matching(query)
-    all_grouped_orders = _group_orders(all_orders_flat)
-
-    total_items = len(all_grouped_orders)
-    total_pages = (total_items + config.ITEMS_PER_PAGE - 1) // config.ITEMS_PER_PAGE if total_items > 0 else 1
-    start_index = (page - 1) * config.ITEMS_PER_PAGE
-    end_index = start_index + config.ITEMS_PER_PAGE
-    paginated_orders = all_grouped_orders[start_index:end_index]
+    paginated_orders, total_pages = _paginate_orders(page, query, include_archive=True)
 
     return render_template(
         'product_list.html',
@@ -340,7 +403,7 @@ def search_shipped():
         total_pages=total_pages
     )
 
-@app.route('/update_shipped_status', methods=['POST'])
+@bp.route('/update_shipped_status', methods=['POST'])
 def update_shipped_status_route():
     order_number = request.form.get('order_number')
     shipped_status = request.form.get('shipped')
@@ -350,7 +413,7 @@ def update_shipped_status_route():
     shipped_value = database.update_shipped_status(order_number, shipped_status)
     return jsonify({"message": "출고 상태가 업데이트되었습니다.", "shipped": shipped_value})
 
-@app.route('/update_memo', methods=['POST'])
+@bp.route('/update_memo', methods=['POST'])
 def update_memo_route():
     order_number = request.form.get('order_number')
     memo = request.form.get('memo', '')
@@ -360,29 +423,63 @@ def update_memo_route():
     database.update_memo(order_number, memo)
     return jsonify({"message": "메모 저장 완료"})
 
-@app.route('/notify_admin', methods=['POST'])
+@bp.route('/rate_limits', methods=['GET'])
+def rate_limits():
+    """외부 API 버킷별 남은 토큰, 대기열 길이, 대기 시간을 반환합니다."""
+    return jsonify(rate_limit.get_stats())
+
+@bp.route('/ocr_stats', methods=['GET'])
+def ocr_stats():
+    """바코드 우선 인식 적중률과 Textract 호출을 건너뛰어 절약한 시간(추정)을 반환합니다."""
+    return jsonify(barcode_reader.get_stats())
+
+@bp.route('/pending_orders', methods=['GET'])
+def pending_orders():
+    """Dell 조회 대기 주문의 상태별 개수와 재시도 중인 항목을 반환합니다."""
+    return jsonify(reconcile.get_stats())
+
+@bp.route('/notify_admin', methods=['POST'])
 def notify_admin():
+    """관리자 호출을 outbox에 기록하고 바로 응답합니다. 실제 메일은 백그라운드 발송 스레드가 보냅니다."""
     try:
-        msg = MIMEText(f"입고 스캔 처리 중 문제가 발생하여 호출드립니다.\n\n"
-                       f"요청자 IP: {request.remote_addr}\n"
-                       f"시간: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        msg['Subject'] = "📡 입고 시스템 관리자 호출"
-        msg['From'] = app.config['SENDER_EMAIL']
-        msg['To'] = app.config['ADMIN_EMAIL']
-
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-            server.login(app.config['SENDER_EMAIL'], app.config['SENDER_PASSWORD'])
-            server.send_message(msg)
-        
-        return jsonify({"message": "관리자에게 메일이 전송되었습니다."})
+        notification_id, coalesced = notifier.enqueue_admin_call(request.remote_addr)
     except Exception as e:
-        logging.error(f"메일 전송 실패: {e}", exc_info=True)
-        return jsonify({"error": "메일 전송에 실패했습니다. 서버 로그를 확인해주세요."}), 500
+        logging.error(f"관리자 호출 저장 실패: {e}", exc_info=True)
+        return jsonify({"error": "관리자 호출에 실패했습니다. 서버 로그를 확인해주세요."}), 500
+
+    if coalesced:
+        message = "관리자 호출이 이미 접수되었습니다. 잠시만 기다려주세요."
+    else:
+        message = "관리자에게 메일이 전송됩니다."
+    return jsonify({"message": message, "notification_id": notification_id, "coalesced": coalesced}), 202
+
+# --- App Factory ---
+
+def create_app():
+    """Flask 앱을 생성합니다. DB 마이그레이션은 실행하지 않으며, 워커 시작 전에 별도로 한 번만 실행해야 합니다."""
+    # 로그 포맷/출력은 백그라운드 스레드에서 처리되므로 요청 처리 시간에 포함되지 않습니다.
+    logging_setup.setup_logging()
+
+    app = Flask(__name__)
+    app.config.from_object(config)
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    app.register_blueprint(bp)
+    app.register_blueprint(api.api_bp)
+    logging_setup.init_app(app)
+    profiler.init_app(app)
+    # 이전 실행에서 남은 outbox 메일도 발송되도록 워커마다 발송 스레드를 시작합니다.
+    notifier.ensure_sender_started()
+    # 오프라인 접수된 주문을 Dell API로 다시 조회하는 스레드 (이전 실행에서 남은 대기 주문 포함)
+    reconcile.ensure_worker_started()
+    # 오래된 출고 주문을 보관 DB로 옮기는 작업. 여러 워커가 시작해도 간격마다 한 워커만 실행합니다.
+    archive.ensure_scheduler_started()
+    return app
 
 # --- Main Execution ---
 
 if __name__ == '__main__':
-    # Set werkzeug logger level
-    log = logging.getLogger('werkzeug')
-    log.setLevel(logging.INFO)
+    # 개발용 실행. 운영 환경에서는 gunicorn -c gunicorn.conf.py wsgi:app 을 사용합니다.
+    migrations.run_migrations()
+    app = create_app()
+    # werkzeug 접근 로그 레벨은 LOG_MODULE_LEVELS(예: werkzeug=WARNING)로 조정합니다.
     app.run(host='0.0.0.0', port=5000, debug=False)
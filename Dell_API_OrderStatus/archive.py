@@ -0,0 +1,124 @@
+import time
+import logging
+import sqlite3
+
+import config
+import background
+from database import get_db_connection, archive_cutoff_date, ORDER_COLUMNS
+
+def _prepare(conn):
+    """보관 DB를 WAL 모드로 두고, 마지막 실행 시각을 기록하는 테이블을 만듭니다."""
+    conn.execute("PRAGMA archive.journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS archive.archive_state (id INTEGER PRIMARY KEY CHECK (id = 1), last_run REAL NOT NULL)")
+    conn.execute("INSERT OR IGNORE INTO archive.archive_state (id, last_run) VALUES (1, 0)")
+    conn.commit()
+
+def _recover(conn):
+    """
+    이전 작업이 복사와 삭제 사이에서 중단되어 양쪽에 남은 행을 정리합니다.
+    보관 DB로 복사된 출고 행은 orders에서 지우고, 출고 취소로 되돌려진 행은 보관 DB에서 지웁니다.
+    """
+    moved = conn.execute(
+        "DELETE FROM main.orders WHERE shipped = 1 AND id IN (SELECT id FROM archive.orders)"
+    ).rowcount
+    conn.commit()
+    restored = conn.execute(
+        "DELETE FROM archive.orders WHERE id IN (SELECT id FROM main.orders WHERE shipped = 0)"
+    ).rowcount
+    conn.commit()
+    if moved or restored:
+        logging.warning(f"Archive recovery: removed {moved} duplicated hot row(s), {restored} restored archive row(s)")
+
+def run_archive(cutoff=None, chunk_size=None, pause_seconds=None):
+    """
+    cutoff(기본: 오늘 - ARCHIVE_AFTER_DAYS)보다 오래된 출고 행을 보관 DB로 옮기고, 옮긴 행 수를 반환합니다.
+    ATTACH한 WAL 데이터베이스 사이에는 원자적 커밋이 보장되지 않으므로, 청크마다 복사를 먼저 커밋한 뒤 삭제합니다.
+    중간에 중단되더라도 다음 실행의 _recover에서 정리됩니다.
+    """
+    cutoff = cutoff or archive_cutoff_date()
+    chunk_size = chunk_size or config.ARCHIVE_CHUNK_SIZE
+    pause_seconds = config.ARCHIVE_CHUNK_PAUSE_SECONDS if pause_seconds is None else pause_seconds
+
+    total = 0
+    started = time.time()
+    with get_db_connection(include_archive=True) as conn:
+        _prepare(conn)
+        _recover(conn)
+        while True:
+            # Dell 조회 대기 중인 행은 재조회 작업이 orders에서 바꿔야 하므로 옮기지 않습니다.
+            ids = [row[0] for row in conn.execute(
+                "SELECT id FROM main.orders WHERE shipped = 1 AND pending = 0 AND created_at < ? ORDER BY id LIMIT ?",
+                (cutoff, chunk_size)
+            ).fetchall()]
+            if not ids:
+                break
+
+            placeholders = ",".join("?" * len(ids))
+            # 복사와 삭제 사이에 출고 취소된 행은 orders에 남기고, 보관 DB의 사본은 _restore_from_archive가 지웁니다.
+            conn.execute(
+                f"INSERT OR IGNORE INTO archive.orders ({ORDER_COLUMNS}) SELECT {ORDER_COLUMNS} FROM main.orders "
+                f"WHERE shipped = 1 AND id IN ({placeholders})",
+                ids
+            )
+            conn.commit()
+            total += conn.execute(f"DELETE FROM main.orders WHERE shipped = 1 AND id IN ({placeholders})", ids).rowcount
+            conn.commit()
+
+            if len(ids) < chunk_size:
+                break
+            # 청크 사이에 쓰기 잠금을 놓아 스캔/저장 요청이 대기하지 않도록 합니다.
+            time.sleep(pause_seconds)
+
+    if total:
+        logging.info(f"Archived {total} shipped row(s) older than {cutoff} in {time.time() - started:.1f}s")
+    return total
+
+def _claim_run():
+    """
+    이번 간격의 보관 작업을 이 프로세스가 실행할지 결정합니다.
+    여러 gunicorn 워커가 동시에 확인해도 BEGIN IMMEDIATE 잠금 때문에 하나만 last_run을 갱신합니다.
+    """
+    now = time.time()
+    with get_db_connection(include_archive=True) as conn:
+        _prepare(conn)
+        conn.isolation_level = None
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT last_run FROM archive.archive_state WHERE id = 1").fetchone()
+            if now - row['last_run'] < config.ARCHIVE_INTERVAL_SECONDS:
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute("UPDATE archive.archive_state SET last_run = ? WHERE id = 1", (now,))
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+def _scheduler_loop():
+    while True:
+        try:
+            if _claim_run():
+                run_archive()
+        except sqlite3.Error as e:
+            logging.error(f"Archive job failed: {e}", exc_info=True)
+        time.sleep(config.ARCHIVE_INTERVAL_SECONDS)
+
+_scheduler = background.BackgroundThread("order-archiver", _scheduler_loop)
+
+def ensure_scheduler_started():
+    """현재 프로세스에서 보관 스케줄러 스레드가 돌고 있지 않으면 시작합니다. ARCHIVE_INTERVAL_SECONDS가 0이면 시작하지 않습니다."""
+    if config.ARCHIVE_INTERVAL_SECONDS <= 0:
+        return
+    _scheduler.ensure_started()
+
+if __name__ == '__main__':
+    # 수동 실행: python archive.py [보관 기준 일수]
+    import sys
+    import datetime
+    import logging_setup
+    logging_setup.setup_logging()
+    cutoff = None
+    if len(sys.argv) > 1:
+        cutoff = (datetime.date.today() - datetime.timedelta(days=int(sys.argv[1]))).strftime('%Y-%m-%d')
+    print(f"Archived {run_archive(cutoff)} row(s).")
@@ -0,0 +1,95 @@
+import os
+import time
+import threading
+
+from database import get_db_connection
+
+# 처리 중 상태로 이 시간(초) 이상 남아 있는 항목은 처리하던 워커가 죽은 것으로 보고 다시 가져옵니다.
+STALE_CLAIM_SECONDS = 300
+
+# --- Retry queue (notifications_outbox, pending_orders) ---
+# 두 테이블 모두 status('pending' → 처리 중 → 완료/'failed'), attempts, next_attempt_at, claimed_at, last_error 컬럼을 가집니다.
+
+def claim_due(table, claimed_status, limit):
+    """
+    처리할 차례가 된 항목(재시도 시각이 지난 'pending' 또는 오래된 처리 중 항목)을 최대 limit개
+    claimed_status로 바꾸고 사전 목록으로 반환합니다. 여러 워커가 같은 항목을 가져가지 않도록 잠금 안에서 처리합니다.
+    """
+    now = time.time()
+    due_condition = f"(status = 'pending' AND next_attempt_at <= ?) OR (status = '{claimed_status}' AND claimed_at < ?)"
+    params = (now, now - STALE_CLAIM_SECONDS)
+    with get_db_connection() as conn:
+        # 대부분의 폴링에서는 처리할 항목이 없으므로, 쓰기 잠금 없이 먼저 확인합니다.
+        # (모든 워커가 폴링마다 BEGIN IMMEDIATE를 잡으면 스캔/저장 요청의 쓰기가 그만큼 기다립니다.)
+        if conn.execute(f"SELECT 1 FROM {table} WHERE {due_condition} LIMIT 1", params).fetchone() is None:
+            return []
+        conn.isolation_level = None
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                f"SELECT * FROM {table} WHERE {due_condition} ORDER BY id LIMIT ?", params + (limit,)
+            ).fetchall()
+            for row in rows:
+                conn.execute(f"UPDATE {table} SET status = ?, claimed_at = ? WHERE id = ?", (claimed_status, now, row['id']))
+            conn.execute("COMMIT")
+            return [dict(row) for row in rows]
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+def mark_failed(table, entries, error, max_attempts, retry_base_seconds):
+    """
+    처리 실패를 기록하고, 최대 시도 횟수 전까지는 지수 백오프(retry_base_seconds × 2^(시도-1))로 재시도를 예약합니다.
+    항목마다 (entry, 시도 횟수, 재시도 여부)를 반환합니다 (로그는 호출한 쪽에서 남깁니다).
+    """
+    now = time.time()
+    outcomes = []
+    with get_db_connection() as conn:
+        for entry in entries:
+            attempts = entry['attempts'] + 1
+            if attempts >= max_attempts:
+                status, next_attempt_at = 'failed', entry['next_attempt_at']
+            else:
+                status, next_attempt_at = 'pending', now + retry_base_seconds * (2 ** (attempts - 1))
+            conn.execute(
+                f"UPDATE {table} SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                (status, attempts, next_attempt_at, str(error), entry['id'])
+            )
+            outcomes.append((entry, attempts, status == 'pending'))
+        conn.commit()
+    return outcomes
+
+# --- Per-process threads ---
+
+class BackgroundThread:
+    """
+    프로세스마다 하나씩 도는 데몬 스레드. gunicorn이 fork한 워커에는 부모의 스레드가 없으므로,
+    ensure_started()가 현재 pid에서 스레드가 살아 있는지 확인하고 없으면 새로 시작합니다.
+    """
+
+    def __init__(self, name, target):
+        self.name = name
+        self.target = target
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _running(self):
+        return self._thread is not None and self._pid == os.getpid() and self._thread.is_alive()
+
+    def ensure_started(self, on_fork=None):
+        """
+        스레드를 시작했으면 True, 이미 돌고 있으면 False를 반환합니다.
+        on_fork는 다른 프로세스(fork 전 부모)에서 시작된 적이 있을 때 새 스레드를 시작하기 전에 호출됩니다.
+        """
+        if self._running():
+            return False
+        with self._lock:
+            if self._running():
+                return False
+            if on_fork is not None and self._pid is not None and self._pid != os.getpid():
+                on_fork()
+            self._thread = threading.Thread(target=self.target, name=self.name, daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+            return True
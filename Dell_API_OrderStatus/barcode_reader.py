@@ -0,0 +1,236 @@
+import io
+import re
+import time
+import atexit
+import logging
+import sqlite3
+import threading
+
+import config
+import background
+from database import get_db_connection
+
+# 바코드 값 전체 또는 구분자(-, 공백 등)로 나눈 한 토큰이 9~10자리 숫자이면 주문 번호로 봅니다.
+# (예: "1013422110", "KR-1013422110") 더 긴 숫자 안에 포함된 번호는 위치를 확신할 수 없으므로 사용하지 않습니다.
+ORDER_NUMBER_RE = re.compile(r'^[0-9]{9,10}$')
+TOKEN_SPLIT_RE = re.compile(r'[^0-9A-Za-z]+')
+# 박스 순번 바코드: 값 전체가 "1 OF 3", "1/3", "BOX 1/3" 이거나 값 안에 "BOX 1 OF 3"이 있는 경우만 인정합니다.
+# (날짜 등 다른 숫자를 박스 순번으로 오인하지 않도록 느슨한 패턴은 쓰지 않고, "03/05"처럼 0으로 시작하는 값도 제외합니다.)
+BOX_PAYLOAD_RE = re.compile(r'^(?:BOX\s*:?\s*)?([1-9][0-9]{0,2})\s*(?:OF|/)\s*([1-9][0-9]{0,2})$', re.IGNORECASE)
+BOX_KEYWORD_RE = re.compile(r'\bBOX\s*:?\s*([1-9][0-9]{0,2})\s*(?:OF|/)\s*([1-9][0-9]{0,2})\b', re.IGNORECASE)
+# Dell 박스 라벨의 고정 폭 바코드: 박스 순번(3) + 5자리(사용하지 않음) + 주문 번호(10) + 전체 박스 수(3).
+# 예: "003500031014749359058" → 주문 1014749359, 58개 중 3번째 박스 (static/images/box_label_example.png)
+DELL_BOX_LABEL_RE = re.compile(r'^([0-9]{3})[0-9]{5}([0-9]{10})([0-9]{3})$')
+# 납품확인서(다중 주문 문서)를 나타내는 표시. 이런 문서는 항상 Textract로 처리합니다.
+MULTI_ORDER_MARKER = "ORDER#"
+
+_unavailable_logged = False
+
+_stats_lock = threading.Lock()
+_pending_stats = {}
+
+def _read_barcodes(image_bytes):
+    """이미지의 모든 1D/2D 바코드 값을 읽습니다. zxing-cpp 또는 Pillow가 없으면 ImportError가 발생합니다."""
+    import zxingcpp
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        # 휴대폰 사진은 EXIF 회전 정보만 있고 픽셀은 돌아가 있지 않은 경우가 많습니다.
+        image = ImageOps.exif_transpose(image).convert('L')
+        return [result.text for result in zxingcpp.read_barcodes(image)]
+
+def find_order_number(payloads):
+    """바코드 값 목록에서 주문 번호 후보를 찾습니다. 서로 다른 후보가 여러 개면 None을 반환합니다."""
+    candidates = set()
+    for payload in payloads:
+        for token in TOKEN_SPLIT_RE.split(payload.strip()):
+            if ORDER_NUMBER_RE.match(token):
+                candidates.add(token)
+    if len(candidates) == 1:
+        return candidates.pop()
+    if len(candidates) > 1:
+        logging.info(f"Barcodes contain several order number candidates {sorted(candidates)}; falling back to OCR.")
+    return None
+
+def _valid_box(box_index, total):
+    return 1 <= box_index <= total <= config.MAX_BOXES_PER_ORDER
+
+def find_dell_box_label(payloads):
+    """
+    Dell 고정 폭 박스 라벨 바코드에서 (주문 번호, 박스 순번, 전체 박스 수)를 찾습니다.
+    라벨이 없거나 서로 다른 라벨이 여러 개면 None, 박스 값이 범위를 벗어나면 (주문 번호, None, None)입니다.
+    """
+    labels = set()
+    for payload in payloads:
+        match = DELL_BOX_LABEL_RE.match(payload.strip())
+        if match:
+            labels.add((match.group(2), int(match.group(1)), int(match.group(3))))
+    if len(labels) != 1:
+        if labels:
+            logging.info(f"Barcodes contain several Dell box labels {sorted(labels)}; falling back to OCR.")
+        return None
+    order_number, box_index, total = labels.pop()
+    if not _valid_box(box_index, total):
+        return order_number, None, None
+    return order_number, box_index, total
+
+def find_box(payloads):
+    """
+    바코드 값 목록에서 박스 순번을 찾아 (box_index, 전체 박스 수)를 반환합니다.
+    찾지 못했거나, 값이 서로 다르거나, 1 <= 순번 <= 전체 <= MAX_BOXES_PER_ORDER가 아니면 (None, None)입니다.
+    """
+    candidates = set()
+    for payload in payloads:
+        match = BOX_PAYLOAD_RE.match(payload.strip()) or BOX_KEYWORD_RE.search(payload)
+        if match:
+            candidates.add((int(match.group(1)), int(match.group(2))))
+    if len(candidates) != 1:
+        return None, None
+    box_index, total = candidates.pop()
+    if not _valid_box(box_index, total):
+        return None, None
+    return box_index, total
+
+def parse_label(payloads):
+    """
+    바코드 값 목록을 (주문 번호, 박스 순번, 전체 박스 수)로 해석합니다. 찾지 못한 값은 None입니다.
+    Dell 고정 폭 박스 라벨을 먼저 보고, 없으면 주문 번호/박스 순번 바코드를 따로 찾습니다.
+    납품확인서처럼 여러 주문이 있는 문서는 주문 번호도 None입니다.
+    """
+    if any(MULTI_ORDER_MARKER in payload.upper() for payload in payloads):
+        logging.info("Barcode looks like a multi-order document; using Textract.")
+        return None, None, None
+    dell_label = find_dell_box_label(payloads)
+    if dell_label is not None:
+        return dell_label
+    order_number = find_order_number(payloads)
+    if not order_number:
+        return None, None, None
+    box_index, box = find_box(payloads)
+    return order_number, box_index, box
+
+def decode_label(image_bytes, source):
+    """
+    사진의 바코드에서 주문 번호와 박스 순번을 읽어 OCR 결과와 같은 형식의 사전을 반환합니다.
+    - 박스 라벨(주문 번호 하나 + 박스 순번)이면 box/box_index가 채워지며, 이 경우에만 Textract를 건너뛸 수 있습니다.
+    - 주문 번호만 읽었으면 box/box_index는 None입니다 (Textract 결과가 없을 때의 대체값으로만 사용).
+    - 주문 번호를 찾지 못했거나 납품확인서처럼 여러 주문이 있는 문서이면 None을 반환합니다.
+    """
+    global _unavailable_logged
+    started = time.perf_counter()
+    try:
+        payloads = _read_barcodes(image_bytes)
+    except ImportError:
+        if not _unavailable_logged:
+            logging.info("zxing-cpp/Pillow not installed; barcode fast path disabled.")
+            _unavailable_logged = True
+        return None
+    except Exception as e:
+        logging.warning(f"Barcode decoding failed for {source}: {e}")
+        payloads = []
+
+    order_number, box_index, box = parse_label(payloads)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if order_number and box_index is not None:
+        record("barcode_hit", elapsed_ms)
+        logging.info(f"✅ Barcode fast path: order {order_number} box {box_index}/{box} from {source} "
+                     f"in {elapsed_ms:.0f}ms (Textract skipped)")
+    elif order_number:
+        record("barcode_order_only", elapsed_ms)
+        logging.info(f"Barcode in {source} has order {order_number} but no box number ({elapsed_ms:.0f}ms); using Textract.")
+    else:
+        record("barcode_miss", elapsed_ms)
+        logging.info(f"No order number barcode in {source} ({len(payloads)} barcode(s), {elapsed_ms:.0f}ms); using Textract.")
+    if not order_number:
+        return None
+    return {"order_number": order_number, "box": box, "box_index": box_index}
+
+# --- Stats ---
+
+def record(name, elapsed_ms):
+    """
+    처리 건수와 소요 시간을 메모리에 누적합니다. DB에는 백그라운드 스레드가 OCR_STATS_FLUSH_SECONDS마다
+    한 번에 기록하므로 요청 처리 중에는 SQLite 쓰기가 일어나지 않습니다.
+    """
+    with _stats_lock:
+        entry = _pending_stats.setdefault(name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed_ms
+    ensure_flusher_started()
+
+def flush_stats():
+    """메모리에 누적된 통계를 ocr_stats에 기록합니다. 저장에 실패하면 다음 기록 때 다시 시도합니다."""
+    global _pending_stats
+    with _stats_lock:
+        pending, _pending_stats = _pending_stats, {}
+    if not pending:
+        return
+    try:
+        with get_db_connection() as conn:
+            conn.executemany(
+                '''INSERT INTO ocr_stats (name, count, total_ms) VALUES (?, ?, ?)
+                   ON CONFLICT(name) DO UPDATE SET count = count + excluded.count, total_ms = total_ms + excluded.total_ms''',
+                [(name, count, total_ms) for name, (count, total_ms) in pending.items()]
+            )
+            conn.commit()
+    except sqlite3.Error as e:
+        logging.warning(f"Failed to record OCR stats, will retry: {e}")
+        with _stats_lock:
+            for name, (count, total_ms) in pending.items():
+                entry = _pending_stats.setdefault(name, [0, 0.0])
+                entry[0] += count
+                entry[1] += total_ms
+
+def _flusher_loop():
+    while True:
+        time.sleep(config.OCR_STATS_FLUSH_SECONDS)
+        flush_stats()
+
+_flusher = background.BackgroundThread("ocr-stats-flusher", _flusher_loop)
+
+def _discard_parent_stats():
+    # fork 전에 부모 프로세스가 누적한 값은 부모가 기록합니다.
+    global _pending_stats
+    with _stats_lock:
+        _pending_stats = {}
+
+def ensure_flusher_started():
+    """현재 프로세스에서 통계 기록 스레드가 돌고 있지 않으면 시작합니다 (fork 이후 워커마다 하나씩)."""
+    if _flusher.ensure_started(on_fork=_discard_parent_stats):
+        atexit.register(flush_stats)
+
+def get_stats():
+    """
+    바코드 우선 처리의 적중률과 절약한 시간. 절약 시간은 적중 건수 × 평균 Textract 호출 시간에서
+    바코드 인식에 쓴 시간(전체)을 뺀 추정값입니다. 다른 워커의 최근 값은 OCR_STATS_FLUSH_SECONDS만큼 늦게 반영됩니다.
+    """
+    flush_stats()
+    try:
+        with get_db_connection() as conn:
+            rows = {row['name']: row for row in conn.execute("SELECT * FROM ocr_stats").fetchall()}
+    except sqlite3.Error as e:
+        logging.error(f"Failed to read OCR stats: {e}", exc_info=True)
+        rows = {}
+
+    def totals(name):
+        row = rows.get(name)
+        return (row['count'], row['total_ms']) if row else (0, 0.0)
+
+    hits, hit_ms = totals("barcode_hit")
+    order_only, order_only_ms = totals("barcode_order_only")
+    misses, miss_ms = totals("barcode_miss")
+    textract_calls, textract_ms = totals("textract")
+    scanned = hits + order_only + misses
+    barcode_ms = hit_ms + order_only_ms + miss_ms
+    avg_textract_ms = textract_ms / textract_calls if textract_calls else None
+    return {
+        "images_scanned": scanned,
+        "barcode_hits": hits,
+        "barcode_order_only": order_only,
+        "hit_rate": round(hits / scanned, 3) if scanned else 0.0,
+        "avg_barcode_ms": round(barcode_ms / scanned, 1) if scanned else 0.0,
+        "textract_calls": textract_calls,
+        "avg_textract_ms": round(avg_textract_ms, 1) if avg_textract_ms is not None else None,
+        "textract_calls_avoided": hits,
+        "estimated_saved_ms": round(hits * avg_textract_ms - barcode_ms) if avg_textract_ms is not None else None,
+    }
@@ -49,3 +49,118 @@ if missing_vars:
     # 누락된 변수 이름을 출력하고 프로그램 중단 (안전한 설정 로딩을 위해 권장)
     print(f"⚠️ 오류: .env 파일에서 다음 필수 환경 변수가 누락되었거나 비어 있습니다: {', '.join(missing_vars)}")
     # raise EnvironmentError(f"Missing required environment variables: {', '.join(missing_vars)}")
+
+# =========================================================
+# 6. 외부 API 호출 속도 제한 (Token Bucket)
+# =========================================================
+# 모든 스레드와 WSGI 워커 프로세스가 같은 SQLite 파일을 통해 버킷을 공유합니다.
+RATE_LIMIT_DB_PATH = os.getenv("RATE_LIMIT_DB_PATH", "rate_limits.db")
+# 버킷 이름: (초당 충전 토큰 수, 최대 버스트 크기)
+RATE_LIMITS = {
+    "dell_token": (float(os.getenv("RATE_LIMIT_DELL_TOKEN_RATE", "0.5")), int(os.getenv("RATE_LIMIT_DELL_TOKEN_BURST", "2"))),
+    "dell_orders": (float(os.getenv("RATE_LIMIT_DELL_ORDERS_RATE", "5")), int(os.getenv("RATE_LIMIT_DELL_ORDERS_BURST", "10"))),
+    "textract": (float(os.getenv("RATE_LIMIT_TEXTRACT_RATE", "1")), int(os.getenv("RATE_LIMIT_TEXTRACT_BURST", "1"))),
+}
+# 토큰을 기다리는 최대 시간(초). 초과하면 호출자는 실패 처리됩니다.
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "30"))
+
+# =========================================================
+# 7. 관리자 호출 메일 발송 (Outbox)
+# =========================================================
+# 로컬 SMTP 테스트 서버(scripts/smtp_stub.py)를 쓰려면 SMTP_HOST=localhost, SMTP_PORT=1025, SMTP_USE_SSL=false 로 설정합니다.
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_USE_SSL = os.getenv("SMTP_USE_SSL", "true").lower() == "true"
+# 같은 스테이션(IP)에서 이 시간(초) 안에 반복 호출하면 메일을 한 번만 보냅니다.
+NOTIFY_COALESCE_SECONDS = int(os.getenv("NOTIFY_COALESCE_SECONDS", "300"))
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "5"))
+# 재시도 간격(초)은 시도할 때마다 두 배씩 늘어납니다.
+NOTIFY_RETRY_BASE_SECONDS = int(os.getenv("NOTIFY_RETRY_BASE_SECONDS", "30"))
+# 보낼 메일이 없을 때 SMTP 연결을 유지하는 시간(초)
+SMTP_IDLE_SECONDS = int(os.getenv("SMTP_IDLE_SECONDS", "60"))
+
+# =========================================================
+# 8. 조회 페이지 캐시 (ETag)
+# =========================================================
+# 워커 프로세스별로 보관하는 렌더링 결과 수
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "64"))
+
+# =========================================================
+# 9. OCR 설정
+# =========================================================
+# PDF 페이지를 동시에 OCR할 최대 스레드 수.
+# Textract 호출 속도는 RATE_LIMITS['textract'](기본 초당 1회, 버스트 1)로 별도 제한되므로, 기본값에서는 스레드가 토큰을 기다릴 뿐
+# 빨라지지 않습니다. 병렬 처리 효과를 보려면 계정의 Textract 한도에 맞춰 RATE_LIMIT_TEXTRACT_RATE/BURST를 함께 올리세요.
+OCR_PDF_WORKERS = int(os.getenv("OCR_PDF_WORKERS", "4"))
+# PDF 한 개의 최대 페이지 수. 넘으면 OCR 전에 거절합니다.
+# 페이지마다 Textract를 한 번 호출하므로, 기본 속도 제한에서 RATE_LIMIT_MAX_WAIT(30초) 안에 처리할 수 있는 정도로 둡니다.
+OCR_PDF_MAX_PAGES = int(os.getenv("OCR_PDF_MAX_PAGES", "20"))
+# Textract 응답 녹화/재생: off(기본) / record(실제 호출 후 응답 저장) / replay(저장된 응답만 사용, AWS 호출 없음)
+OCR_FIXTURE_MODE = os.getenv("OCR_FIXTURE_MODE", "off").lower()
+OCR_FIXTURE_DIR = os.getenv("OCR_FIXTURE_DIR", "ocr_fixtures")
+# 한 주문의 최대 박스 수. 'X of Y' 라벨에서 Y가 이보다 크면 날짜 등을 잘못 읽은 것으로 보고 박스 수로 쓰지 않습니다.
+MAX_BOXES_PER_ORDER = int(os.getenv("MAX_BOXES_PER_ORDER", "99"))
+
+# =========================================================
+# 10. 출고 이력 보관 (Archive)
+# =========================================================
+# 출고 처리되고 이 일수보다 오래된 행은 별도 보관 DB로 옮겨, 일상 조회는 작은 orders 테이블만 사용합니다.
+ARCHIVE_DB_PATH = os.getenv("ARCHIVE_DB_PATH", "orders_archive.db")
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+# 한 트랜잭션에서 옮길 행 수와 청크 사이 대기 시간(초). 작게 나눠 쓰기 요청이 오래 막히지 않도록 합니다.
+ARCHIVE_CHUNK_SIZE = int(os.getenv("ARCHIVE_CHUNK_SIZE", "500"))
+ARCHIVE_CHUNK_PAUSE_SECONDS = float(os.getenv("ARCHIVE_CHUNK_PAUSE_SECONDS", "0.2"))
+# 백그라운드 보관 작업 실행 간격(초). 0이면 앱에서 자동 실행하지 않습니다 (python archive.py로 수동 실행).
+ARCHIVE_INTERVAL_SECONDS = int(os.getenv("ARCHIVE_INTERVAL_SECONDS", "86400"))
+
+# =========================================================
+# 11. 요청 프로파일링
+# =========================================================
+# 프로파일을 수집할 요청 비율 (0.0 ~ 1.0). 관리자 페이지(/admin/profiles)에서 실행 중에 바꿀 수 있습니다.
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# 샘플링된 요청은 이 시간(ms) 이상 걸린 경우에만 저장합니다. 관리자가 X-Profile 헤더/_profile 인자로 요청한 경우는 항상 저장합니다.
+PROFILE_SLOW_MS = int(os.getenv("PROFILE_SLOW_MS", "500"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# 보관할 최근 프로파일 수 (오래된 것부터 삭제)
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "100"))
+# 관리자 토큰. 비어 있으면 관리자 페이지와 X-Profile/_profile 강제 프로파일링이 모두 비활성화됩니다 (샘플링은 동작).
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+
+# =========================================================
+# 12. 로그 설정
+# =========================================================
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# 모듈(또는 로거 이름)별 레벨. 예: "ocr=DEBUG,dell_api=WARNING,werkzeug=WARNING"
+LOG_MODULE_LEVELS = os.getenv("LOG_MODULE_LEVELS", "")
+# json: 한 줄에 JSON 객체 하나 (수집기용) / text: 사람이 읽기 쉬운 형식
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# 이보다 긴 메시지(OCR 전문, API 응답 등)는 잘라서 기록합니다.
+LOG_MAX_MESSAGE_CHARS = int(os.getenv("LOG_MAX_MESSAGE_CHARS", "2000"))
+# DEBUG 로그를 켰을 때 기록할 비율 (0.0 ~ 1.0). 부하 중에 DEBUG를 켜도 로그 양을 제한할 수 있습니다.
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+# 로그 큐 최대 길이. 가득 차면 요청을 막지 않고 로그를 버립니다.
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# =========================================================
+# 13. 오프라인 접수 (Dell API 장애 시)
+# =========================================================
+# true이면 Dell API를 호출하지 않고 항상 주문 번호/박스만 먼저 저장합니다 (스캔 화면의 '오프라인 접수'와 같음).
+OFFLINE_CAPTURE_FORCE = os.getenv("OFFLINE_CAPTURE_FORCE", "false").lower() == "true"
+# 토큰 발급에 실패한 뒤 이 시간(초) 동안은 토큰 요청 없이 바로 오프라인 접수합니다 (작업자가 매번 타임아웃을 기다리지 않도록).
+# 로컬 속도 제한 대기 시간 초과는 토큰 서버의 실패가 아니므로 쿨다운을 시작하지 않습니다. 발급받은 토큰은 만료 전까지 재사용합니다.
+TOKEN_FAILURE_COOLDOWN_SECONDS = int(os.getenv("TOKEN_FAILURE_COOLDOWN_SECONDS", "60"))
+# 대기 주문 재조회: 실행 간격(초), 한 번에 Dell API로 조회할 주문 수, 최대 시도 횟수, 재시도 기본 간격(초, 지수 백오프)
+RECONCILE_INTERVAL_SECONDS = int(os.getenv("RECONCILE_INTERVAL_SECONDS", "60"))
+RECONCILE_BATCH_SIZE = int(os.getenv("RECONCILE_BATCH_SIZE", "20"))
+RECONCILE_MAX_ATTEMPTS = int(os.getenv("RECONCILE_MAX_ATTEMPTS", "12"))
+RECONCILE_RETRY_BASE_SECONDS = int(os.getenv("RECONCILE_RETRY_BASE_SECONDS", "60"))
+
+# =========================================================
+# 14. 바코드 우선 인식
+# =========================================================
+# true이면 라벨 사진의 바코드/QR 코드를 먼저 로컬에서 읽고, 주문 번호와 박스 순번을 모두 찾으면 Textract를 호출하지 않습니다.
+# (zxing-cpp, Pillow 패키지가 없으면 자동으로 Textract만 사용합니다.)
+# 실제 라벨 사진에서 적중률을 확인하기 전까지는 기본값을 false로 둡니다 (scripts/bench_barcode.py로 측정).
+BARCODE_FAST_PATH = os.getenv("BARCODE_FAST_PATH", "false").lower() == "true"
+# 바코드/Textract 처리 통계(/ocr_stats)를 메모리에 모았다가 DB에 기록하는 간격(초)
+OCR_STATS_FLUSH_SECONDS = int(os.getenv("OCR_STATS_FLUSH_SECONDS", "10"))
@@ -1,18 +1,61 @@
+import os
 import sqlite3
+import json
 import datetime
 import logging
 from contextlib import contextmanager
-from config import DB_PATH, ITEMS_PER_PAGE
+from config import DB_PATH, ARCHIVE_DB_PATH, ARCHIVE_AFTER_DAYS
 
-# 로깅 설정
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# 여러 워커 프로세스가 동시에 쓸 때 'database is locked' 오류 대신 대기하도록 합니다.
+BUSY_TIMEOUT_SECONDS = 15
+
+# 보관 DB의 orders 테이블 (main.orders와 같은 컬럼, id는 원래 값을 유지)
+ARCHIVE_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS archive.orders (
+        id INTEGER PRIMARY KEY,
+        order_number TEXT NOT NULL,
+        purchase_order_number TEXT,
+        product_description TEXT NOT NULL,
+        quantity INTEGER NOT NULL,
+        box TEXT,
+        created_at DATE,
+        shipped INTEGER DEFAULT 0,
+        memo TEXT DEFAULT ''
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS archive.idx_archive_order_lines ON orders (order_number, created_at DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS archive.idx_archive_created_at ON orders (created_at)",
+]
+
+ORDER_COLUMNS = "id, order_number, purchase_order_number, product_description, quantity, box, created_at, shipped, memo"
+
+def archive_available():
+    """보관 DB가 만들어져 있는지 확인합니다."""
+    return os.path.exists(ARCHIVE_DB_PATH)
+
+def archive_cutoff_date():
+    """이 날짜보다 오래된 출고 행만 보관 DB로 옮겨집니다. 이 날짜 이후의 조회는 보관 DB가 필요 없습니다."""
+    return (datetime.date.today() - datetime.timedelta(days=ARCHIVE_AFTER_DAYS)).strftime('%Y-%m-%d')
+
+def range_needs_archive(start_date):
+    """날짜 범위 조회에 보관 DB가 필요한지 확인합니다."""
+    return bool(start_date) and start_date < archive_cutoff_date()
 
 @contextmanager
-def get_db_connection():
-    """데이터베이스 연결을 위한 컨텍스트 관리자를 제공합니다."""
+def get_db_connection(include_archive=False):
+    """
+    데이터베이스 연결을 위한 컨텍스트 관리자를 제공합니다.
+    연결은 호출마다 새로 열리므로 fork 이후의 워커 프로세스/스레드 간에 공유되지 않습니다.
+    include_archive이면 보관 DB를 'archive'로 ATTACH합니다 (보관 DB가 없으면 새로 만듭니다).
+    """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_SECONDS)
         conn.row_factory = sqlite3.Row
+        if include_archive:
+            conn.execute("ATTACH DATABASE ? AS archive", (ARCHIVE_DB_PATH,))
+            for statement in ARCHIVE_SCHEMA:
+                conn.execute(statement)
         yield conn
     except sqlite3.Error as e:
         logging.error(f"Database connection error: {e}", exc_info=True)
@@ -21,52 +64,6 @@ def get_db_connection():
         if 'conn' in locals() and conn:
             conn.close()
 
-def init_db():
-    """데이터베이스가 없으면 생성하고, 테이블을 초기화합니다."""
-    try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS orders (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    order_number TEXT NOT NULL,
-                    purchase_order_number TEXT,
-                    product_description TEXT NOT NULL,
-                    quantity INTEGER NOT NULL,
-                    box TEXT,
-                    created_at DATE DEFAULT (DATE('now')),
-                    shipped INTEGER DEFAULT 0,
-                    memo TEXT DEFAULT ''
-                )
-            ''')
-            # Add index for faster lookups
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_order_number ON orders (order_number);')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_created_at ON orders (created_at);')
-            conn.commit()
-        logging.info("✅ SQLite database and table initialized successfully.")
-    except sqlite3.Error as e:
-        logging.error(f"Failed to initialize database: {e}", exc_info=True)
-
-def update_database_schema():
-    """기존 데이터베이스 스키마를 업데이트합니다."""
-    try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("PRAGMA table_info(orders)")
-            columns = [row['name'] for row in cursor.fetchall()]
-
-            if 'shipped' not in columns:
-                cursor.execute("ALTER TABLE orders ADD COLUMN shipped INTEGER DEFAULT 0")
-                logging.info("✅ 'shipped' column added.")
-
-            if 'memo' not in columns:
-                cursor.execute("ALTER TABLE orders ADD COLUMN memo TEXT DEFAULT ''")
-                logging.info("✅ 'memo' column added.")
-            
-            conn.commit()
-    except sqlite3.Error as e:
-        logging.error(f"Failed to update database schema: {e}", exc_info=True)
-
 def save_orders(orders):
     """주문 목록을 데이터베이스에 저장합니다. 중복된 항목은 건너뜁니다."""
     if not orders:
@@ -83,6 +80,9 @@ def save_orders(orders):
                 if not order_number or 'products' not in order:
                     logging.warning(f"Skipping invalid order data: {order}")
                     continue
+                # 오프라인 접수된 주문은 접수 시점에 이미 대기 행으로 저장되었습니다.
+                if order.get('pending'):
+                    continue
 
                 for product in order['products']:
                     description = product.get('description')
@@ -106,27 +106,224 @@ def save_orders(orders):
         return 0
     return saved_count
 
-def get_all_orders_matching(query="", params=()):
-    """검색 조건과 일치하는 모든 주문을 가져옵니다."""
+# 주문 정렬 키: 각 주문의 최신 행(created_at DESC, id DESC 기준 첫 행). 단일 MAX() 집계이므로
+# 같은 SELECT의 나머지 컬럼(구매 주문 번호, 날짜, 출고, 메모, 박스)도 SQLite 규칙에 따라 이 행에서 가져옵니다.
+LINE_KEY_SQL = "printf('%s %012d', created_at, id)"
+SORT_KEY_SQL = f"MAX({LINE_KEY_SQL})"
+# 제품 JSON. SQLite는 json_group_array 안의 순서를 보장하지 않으므로 행마다 정렬 키('k')를 함께 담아
+# 디코딩할 때 기존 순서(created_at DESC, id DESC)로 정렬합니다.
+PRODUCT_JSON_SQL = f"json_object('description', product_description, 'itemQuantity', quantity, 'k', {LINE_KEY_SQL})"
+
+def _and_where(query, condition):
+    return f"{query} AND {condition}" if query else f"WHERE {condition}"
+
+def _products_sql(with_products):
+    """제품 목록 컬럼. 헤더만 필요한 조회는 JSON을 만들지 않습니다."""
+    return f"json_group_array({PRODUCT_JSON_SQL})" if with_products else "NULL"
+
+def _grouped_orders_sql(query="", paged=False, after=False, with_products=True):
+    """
+    주문 번호별로 묶은 주문 목록 SQL을 만듭니다. 제품 목록은 json_group_array로 묶고,
+    제품 순서는 _decode_grouped_row에서 정합니다.
+    paged이면 먼저 해당 페이지의 주문 번호만 고른 뒤 그 주문의 행만 집계합니다.
+    """
+    lines_query = query
+    if paged:
+        having = "HAVING sort_key < ?" if after else ""
+        lines_query = _and_where(query, "order_number IN (SELECT order_number FROM page)")
+        page_cte = f'''
+            WITH page AS (
+                SELECT order_number, {SORT_KEY_SQL} AS sort_key
+                FROM orders {query}
+                GROUP BY order_number {having}
+                ORDER BY sort_key DESC
+                LIMIT ? OFFSET ?
+            )
+        '''
+    else:
+        page_cte = ""
+    return f'''
+        {page_cte}
+        SELECT order_number, purchase_order_number, created_at, shipped, memo, box, pending,
+               {SORT_KEY_SQL} AS sort_key,
+               {_products_sql(with_products)} AS products
+        FROM main.orders
+        {lines_query}
+        GROUP BY order_number
+        ORDER BY sort_key DESC
+    '''
+
+def _grouped_orders_with_archive_sql(query="", paged=False, after=False, with_products=True):
+    """
+    orders와 보관 DB를 합쳐 주문 번호별로 묶는 SQL입니다.
+    paged이면 테이블마다 주문 번호별 정렬 키만 구해 합친 뒤 해당 페이지의 주문 번호를 먼저 고르고,
+    그 주문의 행만 두 테이블에서 가져와 집계합니다. 헤더 컬럼은 _grouped_orders_sql과 같은 단일 MAX() 규칙을 따릅니다.
+    """
+    if paged:
+        having = "HAVING sort_key < ?" if after else ""
+        page_cte = f'''
+            keys AS (
+                SELECT order_number, {SORT_KEY_SQL} AS sort_key FROM main.orders {query} GROUP BY order_number
+                UNION ALL
+                SELECT order_number, {SORT_KEY_SQL} AS sort_key FROM archive.orders {query} GROUP BY order_number
+            ),
+            page AS (
+                SELECT order_number, MAX(sort_key) AS sort_key
+                FROM keys
+                GROUP BY order_number {having}
+                ORDER BY sort_key DESC
+                LIMIT ? OFFSET ?
+            ),
+        '''
+        lines_query = _and_where(query, "order_number IN (SELECT order_number FROM page)")
+    else:
+        page_cte = ""
+        lines_query = query
+    return f'''
+        WITH {page_cte}
+        lines AS (
+            SELECT {ORDER_COLUMNS}, pending FROM main.orders {lines_query}
+            UNION ALL
+            SELECT {ORDER_COLUMNS}, 0 AS pending FROM archive.orders {lines_query}
+        )
+        SELECT order_number, purchase_order_number, created_at, shipped, memo, box, pending,
+               {SORT_KEY_SQL} AS sort_key,
+               {_products_sql(with_products)} AS products
+        FROM lines
+        GROUP BY order_number
+        ORDER BY sort_key DESC
+    '''
+
+def _grouped_orders_query(query, params, limit=None, offset=0, after=None, include_archive=False, with_products=True):
+    """그룹화 조회 SQL과 파라미터를 만듭니다. 보관 DB가 필요한 조회만 UNION 경로를 사용합니다."""
+    paged = limit is not None
+    build_sql = _grouped_orders_with_archive_sql if include_archive else _grouped_orders_sql
+    sql = build_sql(query, paged=paged, after=after is not None, with_products=with_products)
+    # 각 테이블(또는 orders 하나)에 같은 WHERE 조건이 들어갑니다.
+    table_params = list(params) * (2 if include_archive else 1)
+    sql_params = []
+    if paged:
+        # 페이지 선택 CTE: 주문 번호별 정렬 키 → (키셋 조건) → LIMIT/OFFSET
+        sql_params += table_params
+        if after is not None:
+            sql_params.append(after)
+        sql_params += [limit, offset]
+    sql_params += table_params
+    return sql, sql_params
+
+def _decode_products(products_json):
+    products = json.loads(products_json)
+    products.sort(key=lambda product: product['k'], reverse=True)
+    return [{"description": product['description'], "itemQuantity": product['itemQuantity']} for product in products]
+
+def _decode_grouped_row(row, with_products=True):
+    order = {
+        "order_number": row['order_number'],
+        "purchase_order_number": row['purchase_order_number'],
+        "created_at": row['created_at'],
+        "shipped": row['shipped'],
+        "memo": row['memo'],
+        "box": row['box'],
+        "pending": row['pending'],
+    }
+    if with_products:
+        order["products"] = _decode_products(row['products'])
+    return order
+
+def get_grouped_orders(query="", params=(), limit=None, offset=0, include_archive=False):
+    """
+    검색 조건과 일치하는 주문을 주문 번호별로 묶어 최신순으로 가져옵니다 (DB에서 그룹화, 주문당 JSON 한 번 디코딩).
+    limit을 지정하면 해당 페이지의 주문만 가져옵니다. include_archive이면 보관 DB도 함께 조회합니다.
+    """
+    include_archive = include_archive and archive_available()
+    sql, sql_params = _grouped_orders_query(query, params, limit=limit, offset=offset, include_archive=include_archive)
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            select_query = f"SELECT * FROM orders {query} ORDER BY created_at DESC, id DESC"
-            cursor.execute(select_query, params)
-            # 결과를 사전 목록으로 변환하여 반환
-            return [dict(row) for row in cursor.fetchall()]
+        with get_db_connection(include_archive=include_archive) as conn:
+            rows = conn.execute(sql, sql_params).fetchall()
+            return [_decode_grouped_row(row) for row in rows]
     except sqlite3.Error as e:
-        logging.error(f"Failed to get all matching orders: {e}", exc_info=True)
+        logging.error(f"Failed to get grouped orders: {e}", exc_info=True)
         return []
 
+def count_grouped_orders(query="", params=(), include_archive=False):
+    """검색 조건과 일치하는 주문 번호 개수를 반환합니다."""
+    include_archive = include_archive and archive_available()
+    if include_archive:
+        sql = f'''
+            SELECT COUNT(DISTINCT order_number) FROM (
+                SELECT order_number FROM main.orders {query}
+                UNION ALL
+                SELECT order_number FROM archive.orders {query}
+            )
+        '''
+        sql_params = list(params) * 2
+    else:
+        sql, sql_params = f"SELECT COUNT(DISTINCT order_number) FROM orders {query}", params
+    try:
+        with get_db_connection(include_archive=include_archive) as conn:
+            return conn.execute(sql, sql_params).fetchone()[0]
+    except sqlite3.Error as e:
+        logging.error(f"Failed to count grouped orders: {e}", exc_info=True)
+        return 0
+
+def get_order_page(query="", params=(), after=None, limit=10, include_archive=False, with_products=True):
+    """
+    검색 조건과 일치하는 주문을 주문 번호 단위로 묶어 한 페이지씩 가져옵니다 (키셋 페이지네이션).
+    after는 직전 페이지 마지막 주문의 정렬 키이며, (주문 목록, 다음 페이지 키 또는 None)을 반환합니다.
+    with_products가 False이면 제품 목록을 만들지도 디코딩하지도 않으며, 주문에 "products" 키가 없습니다.
+    """
+    include_archive = include_archive and archive_available()
+    sql, sql_params = _grouped_orders_query(query, params, limit=limit + 1, after=after,
+                                            include_archive=include_archive, with_products=with_products)
+    try:
+        with get_db_connection(include_archive=include_archive) as conn:
+            rows = conn.execute(sql, sql_params).fetchall()
+    except sqlite3.Error as e:
+        logging.error(f"Failed to get order page: {e}", exc_info=True)
+        return [], None
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_key = rows[-1]['sort_key'] if has_more and rows else None
+    return [_decode_grouped_row(row, with_products) for row in rows], next_key
+
+def _bump_data_version(conn):
+    """보관 DB만 바뀐 경우에는 트리거가 동작하지 않으므로 데이터 버전을 직접 올립니다."""
+    conn.execute("UPDATE data_version SET version = version + 1 WHERE id = 1")
+
+def _restore_from_archive(conn, order_number):
+    """
+    보관된 주문을 orders 테이블로 되돌립니다 (출고 취소 시). 복사를 먼저 커밋한 뒤 보관 DB에서 지웁니다.
+    보관 작업의 복사와 삭제 사이에 출고 취소되면 행이 orders에 남아 있으므로, 되돌린 행이 없어도
+    orders에 있는 id의 보관 사본은 지웁니다.
+    """
+    cursor = conn.execute(
+        f"INSERT OR IGNORE INTO main.orders ({ORDER_COLUMNS}) SELECT {ORDER_COLUMNS} FROM archive.orders WHERE order_number = ?",
+        (order_number,)
+    )
+    restored = cursor.rowcount
+    conn.execute("UPDATE main.orders SET shipped = 0 WHERE order_number = ?", (order_number,))
+    conn.commit()
+    removed = conn.execute(
+        "DELETE FROM archive.orders WHERE order_number = ? AND id IN (SELECT id FROM main.orders WHERE order_number = ?)",
+        (order_number, order_number)
+    ).rowcount
+    conn.commit()
+    if restored or removed:
+        logging.info(f"Restored {restored} archived row(s) for order {order_number}, removed {removed} archive copy(ies)")
+
 def update_shipped_status(order_number, shipped_status):
     """주문의 출고 상태를 업데이트합니다."""
     shipped_value = 1 if shipped_status == "true" else 0
+    include_archive = archive_available()
     try:
-        with get_db_connection() as conn:
+        with get_db_connection(include_archive=include_archive) as conn:
             cursor = conn.cursor()
-            cursor.execute("UPDATE orders SET shipped = ? WHERE order_number = ?", (shipped_value, order_number))
+            cursor.execute("UPDATE main.orders SET shipped = ? WHERE order_number = ?", (shipped_value, order_number))
             conn.commit()
+            if include_archive and shipped_value == 0:
+                # 보관 DB에는 출고된 행만 있어야 하므로, 출고 취소된 주문은 다시 orders로 옮깁니다.
+                _restore_from_archive(conn, order_number)
         logging.info(f"Updated shipped status for order {order_number} to {shipped_value}")
         return shipped_value
     except sqlite3.Error as e:
@@ -135,41 +332,71 @@ def update_shipped_status(order_number, shipped_status):
 
 def update_memo(order_number, memo):
     """주문의 메모를 업데이트합니다."""
+    include_archive = archive_available()
     try:
-        with get_db_connection() as conn:
+        with get_db_connection(include_archive=include_archive) as conn:
             cursor = conn.cursor()
-            cursor.execute("UPDATE orders SET memo = ? WHERE order_number = ?", (memo, order_number))
+            cursor.execute("UPDATE main.orders SET memo = ? WHERE order_number = ?", (memo, order_number))
+            if include_archive:
+                cursor.execute("UPDATE archive.orders SET memo = ? WHERE order_number = ?", (memo, order_number))
+                if cursor.rowcount > 0:
+                    _bump_data_version(conn)
             conn.commit()
         logging.info(f"Updated memo for order {order_number}")
     except sqlite3.Error as e:
         logging.error(f"Failed to update memo for order {order_number}: {e}", exc_info=True)
 
+def get_data_version():
+    """orders 테이블의 데이터 버전을 반환합니다. 저장/출고/메모 변경 시 트리거로 증가합니다."""
+    try:
+        with get_db_connection() as conn:
+            row = conn.execute("SELECT version FROM data_version WHERE id = 1").fetchone()
+            return row[0] if row else None
+    except sqlite3.Error as e:
+        logging.error(f"Failed to get data version: {e}", exc_info=True)
+        return None
+
 # --- One-off Functions (can be run manually if needed) ---
 
+_archive_dates_cache = {"mtime": None, "dates": []}
+
+def _get_archive_dates():
+    """보관 DB의 날짜 목록. 보관 DB는 보관 작업 때만 바뀌므로 파일 수정 시각이 같으면 캐시를 사용합니다."""
+    if not archive_available():
+        return []
+    mtime = os.path.getmtime(ARCHIVE_DB_PATH)
+    wal_path = ARCHIVE_DB_PATH + "-wal"
+    if os.path.exists(wal_path):
+        mtime = max(mtime, os.path.getmtime(wal_path))
+    if _archive_dates_cache["mtime"] != mtime:
+        with get_db_connection(include_archive=True) as conn:
+            rows = conn.execute("SELECT DISTINCT created_at FROM archive.orders").fetchall()
+        _archive_dates_cache["dates"] = [row[0] for row in rows]
+        _archive_dates_cache["mtime"] = mtime
+    return _archive_dates_cache["dates"]
+
 def get_all_dates():
-    """주문이 존재하는 모든 날짜를 가져옵니다."""
+    """주문이 존재하는 모든 날짜를 가져옵니다 (보관된 날짜 포함)."""
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT DISTINCT created_at FROM orders ORDER BY created_at ASC")
-            return [row[0] for row in cursor.fetchall()]
+            dates = [row[0] for row in cursor.fetchall()]
+        archive_dates = _get_archive_dates()
+        if archive_dates:
+            dates = sorted(set(dates).union(archive_dates), key=lambda d: (d is None, d))
+        return dates
     except sqlite3.Error as e:
         logging.error(f"Failed to get all dates: {e}", exc_info=True)
         return []
 
 def get_orders_by_date_range(start_date, end_date):
-    """지정된 날짜 범위의 주문을 가져옵니다."""
-    try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT * FROM orders WHERE DATE(created_at) BETWEEN DATE(?) AND DATE(?) ORDER BY created_at DESC, id DESC",
-                (start_date, end_date)
-            )
-            return cursor.fetchall()
-    except sqlite3.Error as e:
-        logging.error(f"Failed to get orders by date range: {e}", exc_info=True)
-        return []
+    """지정된 날짜 범위의 주문을 주문 번호별로 묶어 가져옵니다."""
+    return get_grouped_orders(
+        "WHERE DATE(created_at) BETWEEN DATE(?) AND DATE(?)",
+        (start_date, end_date),
+        include_archive=range_needs_archive(start_date)
+    )
 
 def get_latest_date():
     """가장 최신 주문 날짜를 가져옵니다."""
@@ -178,11 +405,14 @@ def get_latest_date():
             cursor = conn.cursor()
             cursor.execute("SELECT MAX(created_at) FROM orders")
             result = cursor.fetchone()
-            return result[0] if result and result[0] else None
+            if result and result[0]:
+                return result[0]
+        # orders가 비어 있으면 (모두 보관된 경우) 보관 DB에서 찾습니다.
+        if archive_available():
+            with get_db_connection(include_archive=True) as conn:
+                result = conn.execute("SELECT MAX(created_at) FROM archive.orders").fetchone()
+                return result[0] if result and result[0] else None
+        return None
     except sqlite3.Error as e:
         logging.error(f"Failed to get latest date: {e}", exc_info=True)
         return None
-
-# Initialize database on application start
-init_db()
-update_database_schema()
@@ -1,9 +1,27 @@
-import requests
+import os
+import time
+import threading
 import logging
 from config import API_KEY, SHARED_SECRET, TOKEN_URL, API_URL
+import rate_limit
 
-# 로깅 설정
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# HTTP 연결 풀(requests.Session)은 스레드별, 프로세스별로 생성합니다.
+# fork 이전에 만들어진 세션(소켓)을 워커가 물려받아 공유하지 않도록 pid를 함께 확인합니다.
+# requests는 실제 API 호출 시점에 import하여 조회 화면만 쓰는 요청의 시작 비용을 줄입니다.
+_local = threading.local()
+
+# 발급받은 Access Token (프로세스별). 만료 TOKEN_EXPIRY_MARGIN_SECONDS초 전까지 재사용합니다.
+TOKEN_EXPIRY_MARGIN_SECONDS = 60
+_token_lock = threading.Lock()
+_cached_token = {"access_token": None, "expires_at": 0.0}
+
+def _get_session():
+    """현재 프로세스/스레드 전용 requests.Session을 반환합니다."""
+    if getattr(_local, 'pid', None) != os.getpid():
+        import requests
+        _local.session = requests.Session()
+        _local.pid = os.getpid()
+    return _local.session
 
 # --- Custom Exceptions ---
 class DellApiError(Exception):
@@ -14,10 +32,25 @@ class TokenError(DellApiError):
     """Raised when the access token cannot be obtained."""
     pass
 
-class OrderFetchError(DellApiError):
-    """Raised when order data cannot be fetched."""
+class TokenRateLimited(TokenError):
+    """Raised when the token request waited too long for the local rate limiter (the token endpoint was not called)."""
     pass
 
+class OrderFetchError(DellApiError):
+    """Raised when order data cannot be fetched. status_code is the HTTP status, or None if there was no response."""
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+    def is_order_specific(self):
+        """
+        요청한 주문 때문에 실패했을 수 있는 응답인지 (잘못된 주문 번호 등). 인증/속도 제한/게이트웨이 오류나
+        응답이 없는 경우는 API 전체의 문제이므로 주문을 나눠 다시 조회해도 소용이 없습니다.
+        """
+        if self.status_code is None:
+            return False
+        return self.status_code == 500 or (400 <= self.status_code < 500 and self.status_code not in (401, 403, 408, 429))
+
 # --- Constants ---
 SEED_EQUIPMENT_DETAILS = {
     "purchase_order_number": "시드 장비(주문 조회 불가)",
@@ -26,8 +59,19 @@ SEED_EQUIPMENT_DETAILS = {
     "box": " "
 }
 
+def invalidate_access_token():
+    """캐시된 Access Token을 버립니다 (API가 401을 반환했을 때)."""
+    with _token_lock:
+        _cached_token["access_token"], _cached_token["expires_at"] = None, 0.0
+
 def get_access_token():
-    """OAuth 2.0 인증을 통해 Access Token 가져오기"""
+    """OAuth 2.0 인증을 통해 Access Token 가져오기. 만료 전이면 이전에 받은 토큰을 재사용합니다."""
+    import requests
+
+    with _token_lock:
+        if _cached_token["access_token"] and time.time() < _cached_token["expires_at"]:
+            return _cached_token["access_token"]
+
     payload = {
         'grant_type': 'client_credentials',
         'client_id': API_KEY,
@@ -35,12 +79,25 @@ def get_access_token():
     }
     logging.info(f"Requesting Access Token from URL: {TOKEN_URL}")
     try:
-        response = requests.post(TOKEN_URL, data=payload, timeout=10)
+        rate_limit.acquire("dell_token")
+    except rate_limit.RateLimitTimeout as e:
+        raise TokenRateLimited(str(e)) from e
+    try:
+        response = _get_session().post(TOKEN_URL, data=payload, timeout=10)
         response.raise_for_status()
-        access_token = response.json().get('access_token')
+        token_data = response.json()
+        access_token = token_data.get('access_token')
         if not access_token:
             raise TokenError("Access token not found in the response.")
-        logging.info("✅ Access Token successfully obtained.")
+        try:
+            expires_in = float(token_data.get('expires_in') or 0)
+        except (TypeError, ValueError):
+            expires_in = 0
+        if expires_in > TOKEN_EXPIRY_MARGIN_SECONDS:
+            with _token_lock:
+                _cached_token["access_token"] = access_token
+                _cached_token["expires_at"] = time.time() + expires_in - TOKEN_EXPIRY_MARGIN_SECONDS
+        logging.info(f"✅ Access Token successfully obtained (expires in {expires_in:.0f}s).")
         return access_token
     except requests.exceptions.RequestException as e:
         logging.error(f"❌ Access Token request failed: {e}")
@@ -50,6 +107,8 @@ def get_access_token():
 
 def fetch_order_data(order_numbers, access_token): 
     """주문 데이터 가져오기"""
+    import requests
+
     headers = {
         "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/json"
@@ -62,7 +121,11 @@ def fetch_order_data(order_numbers, access_token):
     }
     logging.info(f"Requesting order data from Dell API for orders: {order_numbers}")
     try:
-        response = requests.post(API_URL, json=payload, headers=headers, timeout=15)
+        rate_limit.acquire("dell_orders")
+    except rate_limit.RateLimitTimeout as e:
+        raise OrderFetchError(str(e)) from e
+    try:
+        response = _get_session().post(API_URL, json=payload, headers=headers, timeout=15)
         response.raise_for_status()
         logging.info("✅ Successfully received data from Dell API.")
         return response.json()
@@ -71,7 +134,11 @@ def fetch_order_data(order_numbers, access_token):
         if e.response is not None:
             logging.error(f"  - Response status code: {e.response.status_code}")
             logging.error(f"  - Response content: {e.response.text}")
-        raise OrderFetchError(f"Failed to fetch order data for {order_numbers}.") from e
+        status_code = e.response.status_code if e.response is not None else None
+        if status_code == 401:
+            # 만료 전에 폐기된 토큰일 수 있으므로 다음 호출에서 새로 발급받습니다.
+            invalidate_access_token()
+        raise OrderFetchError(f"Failed to fetch order data for {order_numbers}.", status_code) from e
 
 def extract_order_details(order_number, order_data):
     """주문 데이터에서 필요한 세부 정보를 추출하고 동일한 Description의 수량 합산"""
@@ -109,5 +176,21 @@ def extract_order_details(order_number, order_data):
             {"description": desc, "itemQuantity": qty} for desc, qty in product_summary.items()
         ] if product_summary else [{"description": "제품 정보 없음", "itemQuantity": 0}]
     }
-    logging.info(f"✅ Order details extracted successfully: {extracted_details}")
+    logging.info(f"✅ Order details extracted for {order_number}: {len(extracted_details['products'])} product line(s)")
+    # 전체 내용은 DEBUG에서만 기록합니다. 인자로 넘겨 DEBUG가 꺼져 있으면 문자열을 만들지 않습니다.
+    logging.debug("Extracted order details: %s", extracted_details)
     return extracted_details
+
+def split_order_response(order_data, order_numbers):
+    """
+    여러 주문을 한 번에 조회한 응답을 주문 번호별 응답으로 나눕니다.
+    각 주문에는 그 주문이 들어 있는 purchaseOrderDetails만 남기므로, 단건 조회와 같은 방식으로
+    extract_order_details()에 넘길 수 있습니다 (응답에 없는 주문은 시드 장비로 처리됩니다).
+    """
+    split = {order_number: {"purchaseOrderDetails": []} for order_number in order_numbers}
+    for purchase_order in (order_data or {}).get('purchaseOrderDetails', []) or []:
+        for order in purchase_order.get('dellOrders', []):
+            entry = split.get(order.get('orderNumber'))
+            if entry is not None and purchase_order not in entry["purchaseOrderDetails"]:
+                entry["purchaseOrderDetails"].append(purchase_order)
+    return split
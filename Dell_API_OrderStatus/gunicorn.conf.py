@@ -0,0 +1,23 @@
+import os
+import multiprocessing
+
+# =========================================================
+# gunicorn 운영 설정 (환경 변수로 재정의 가능)
+# =========================================================
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+# 요청 대부분이 OCR/Dell API 응답을 기다리는 I/O 작업이므로 워커마다 스레드를 둡니다.
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+# OCR + Dell API 조회가 여러 건이면 기본 30초를 넘길 수 있습니다.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "180"))
+graceful_timeout = 30
+# 앱은 fork 이후 각 워커에서 import합니다. boto3 클라이언트, HTTP 세션, DB 연결이 워커 간에 공유되지 않습니다.
+preload_app = False
+accesslog = "-"
+errorlog = "-"
+
+def on_starting(server):
+    """워커를 fork하기 전에 마스터 프로세스에서 DB 마이그레이션을 정확히 한 번 실행합니다."""
+    import migrations
+    migrations.run_migrations()
@@ -0,0 +1,191 @@
+import os
+import sys
+import json
+import uuid
+import queue
+import atexit
+import random
+import logging
+import datetime
+import threading
+import contextvars
+import logging.handlers
+
+import config
+
+# 현재 요청의 ID. 요청을 처리하는 스레드에서 설정되며, 로그 레코드를 큐에 넣을 때 함께 기록됩니다.
+request_id_var = contextvars.ContextVar('request_id', default='-')
+
+_setup_lock = threading.Lock()
+_listener = None
+_listener_pid = None
+_dropped = 0
+
+def parse_module_levels(value):
+    """'ocr=DEBUG,dell_api=WARNING' 형식을 {'ocr': 10, 'dell_api': 30}으로 바꿉니다."""
+    levels = {}
+    for item in value.split(','):
+        if '=' not in item:
+            continue
+        name, level = (part.strip() for part in item.split('=', 1))
+        levels[name] = logging.getLevelName(level.upper())
+        if not isinstance(levels[name], int):
+            raise ValueError(f"Unknown log level '{level}' for '{name}' in LOG_MODULE_LEVELS")
+    return levels
+
+class _ModuleLevelFilter(logging.Filter):
+    """
+    모듈별 레벨 적용과 DEBUG 샘플링. 대부분의 모듈이 logging.info()로 루트 로거에 기록하므로
+    로거 이름이 아니면 레코드의 모듈 이름(파일 이름)으로 레벨을 찾습니다.
+    """
+
+    def __init__(self, default_level, module_levels, debug_sample_rate):
+        super().__init__()
+        self.default_level = default_level
+        self.module_levels = module_levels
+        self.debug_sample_rate = debug_sample_rate
+
+    def filter(self, record):
+        level = self.module_levels.get(record.name, self.module_levels.get(record.module, self.default_level))
+        if record.levelno < level:
+            return False
+        if record.levelno <= logging.DEBUG and self.debug_sample_rate < 1 and random.random() >= self.debug_sample_rate:
+            return False
+        return True
+
+# 나중에 바뀔 수 없는 로그 인자 타입. 이런 인자만 있으면 메시지 포맷을 리스너 스레드로 미룹니다.
+_IMMUTABLE_ARG_TYPES = (str, bytes, int, float, bool, type(None))
+
+def _args_are_immutable(args):
+    # 인자가 dict 하나이면 logging이 그 dict 자체를 args로 두므로 변경 가능한 것으로 봅니다.
+    return isinstance(args, tuple) and all(isinstance(value, _IMMUTABLE_ARG_TYPES) for value in args)
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    요청 스레드에서는 레코드를 큐에 넣기만 합니다. 기본 QueueHandler.prepare()는 호출한 스레드에서
+    포맷까지 하지만, 여기서는 요청 ID만 붙이고 포맷/쓰기는 리스너 스레드에서 처리합니다.
+    단, %-스타일 인자에 dict/list 같은 변경 가능한 객체가 있으면 그 레코드의 메시지만 요청 스레드에서 확정합니다.
+    (이 프로젝트의 로그는 대부분 f-string이라 인자가 없습니다.)
+    """
+
+    def prepare(self, record):
+        # 루트 로거의 핸들러는 이 핸들러 하나뿐이므로 레코드를 복사하지 않고 그대로 넘깁니다.
+        record.request_id = request_id_var.get()
+        if record.args and not _args_are_immutable(record.args):
+            # 리스너가 포맷하기 전에 인자가 바뀔 수 있으므로 메시지를 지금 확정합니다.
+            # 인자를 repr 등으로 바꿔 두면 %d 같은 형식 지정자와 맞지 않으므로 getMessage()를 그대로 씁니다.
+            record.msg, record.args = record.getMessage(), None
+        return record
+
+    def enqueue(self, record):
+        global _dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _dropped += 1
+
+def _truncate(message):
+    limit = config.LOG_MAX_MESSAGE_CHARS
+    if limit and len(message) > limit:
+        return f"{message[:limit]}... (+{len(message) - limit} chars)"
+    return message
+
+class JsonFormatter(logging.Formatter):
+    """한 줄에 JSON 객체 하나를 출력합니다."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "pid": record.process,
+            "thread": record.threadName,
+            "request_id": getattr(record, 'request_id', '-'),
+            "msg": _truncate(record.getMessage()),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s - %(process)d - %(request_id)s - %(levelname)s - %(message)s')
+
+    def format(self, record):
+        record.request_id = getattr(record, 'request_id', '-')
+        record.msg, record.args = _truncate(record.getMessage()), None
+        return super().format(record)
+
+def get_dropped_count():
+    """큐가 가득 차서 버려진 로그 수."""
+    return _dropped
+
+def setup_logging():
+    """
+    루트 로거를 큐 기반 핸들러 하나로 설정합니다. 프로세스마다 한 번만 설정되며,
+    fork된 워커에서 다시 호출하면 그 워커용 리스너 스레드를 새로 시작합니다.
+    """
+    global _listener, _listener_pid
+    with _setup_lock:
+        if _listener is not None and _listener_pid == os.getpid():
+            return
+
+        default_level = logging.getLevelName(config.LOG_LEVEL)
+        if not isinstance(default_level, int):
+            default_level = logging.INFO
+        module_levels = parse_module_levels(config.LOG_MODULE_LEVELS)
+
+        stream_handler = logging.StreamHandler(sys.stderr)
+        stream_handler.setFormatter(JsonFormatter() if config.LOG_FORMAT == 'json' else TextFormatter())
+
+        log_queue = queue.Queue(maxsize=config.LOG_QUEUE_SIZE)
+        queue_handler = _NonBlockingQueueHandler(log_queue)
+        queue_handler.addFilter(_ModuleLevelFilter(default_level, module_levels, config.LOG_DEBUG_SAMPLE_RATE))
+
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        # 모듈별로 더 낮은 레벨을 지정한 경우에도 레코드가 만들어지도록 루트는 가장 낮은 레벨로 둡니다.
+        root.setLevel(min([default_level, *module_levels.values()]))
+        for name, level in module_levels.items():
+            # werkzeug처럼 이름 있는 로거가 자체 레벨을 가진 경우에도 설정이 적용되도록 합니다.
+            logging.getLogger(name).setLevel(level)
+
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        _listener_pid = os.getpid()
+        atexit.register(_stop_listener)
+
+def _stop_listener():
+    """종료 시 큐에 남은 로그를 모두 기록합니다."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None and _listener_pid == os.getpid():
+            _listener.stop()
+        _listener = None
+
+# --- Request ID ---
+
+def _assign_request_id():
+    from flask import g, request
+    request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex[:12]
+    g.request_id_token = request_id_var.set(request_id[:64])
+
+def _add_request_id_header(response):
+    response.headers['X-Request-ID'] = request_id_var.get()
+    return response
+
+def _reset_request_id(exc):
+    from flask import g
+    token = g.pop('request_id_token', None)
+    if token is not None:
+        # gthread 워커는 스레드를 재사용하므로 다음 요청에 이전 ID가 남지 않도록 되돌립니다.
+        request_id_var.reset(token)
+
+def init_app(app):
+    """요청마다 ID를 부여하고(X-Request-ID 헤더가 있으면 그대로 사용) 응답 헤더로 돌려줍니다."""
+    app.before_request(_assign_request_id)
+    app.after_request(_add_request_id_header)
+    app.teardown_request(_reset_request_id)
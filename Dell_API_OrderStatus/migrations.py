@@ -0,0 +1,163 @@
+import sqlite3
+import logging
+
+from database import get_db_connection
+
+# =========================================================
+# 버전 관리 마이그레이션
+# =========================================================
+# 적용된 스키마 버전은 SQLite 헤더의 PRAGMA user_version에 기록됩니다.
+# 새 스키마 변경은 아래 목록 끝에 다음 버전 번호로 추가합니다. 이미 배포된 마이그레이션은 수정하지 않습니다.
+MIGRATIONS = []
+
+def migration(version, description):
+    """마이그레이션 함수를 등록하는 데코레이터입니다. 함수는 트랜잭션 안에서 연결(conn)을 받아 실행됩니다."""
+    def decorator(func):
+        MIGRATIONS.append((version, description, func))
+        return func
+    return decorator
+
+@migration(1, "orders 테이블 및 인덱스 생성")
+def _create_orders_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_number TEXT NOT NULL,
+            purchase_order_number TEXT,
+            product_description TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            box TEXT,
+            created_at DATE DEFAULT (DATE('now')),
+            shipped INTEGER DEFAULT 0,
+            memo TEXT DEFAULT ''
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_order_number ON orders (order_number)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_created_at ON orders (created_at)')
+
+@migration(2, "구버전 DB에 shipped, memo 컬럼 추가")
+def _add_shipped_and_memo_columns(conn):
+    # 버전 관리 도입 이전에 만들어진 DB는 이 컬럼이 있을 수도, 없을 수도 있습니다.
+    columns = [row['name'] for row in conn.execute("PRAGMA table_info(orders)").fetchall()]
+    if 'shipped' not in columns:
+        conn.execute("ALTER TABLE orders ADD COLUMN shipped INTEGER DEFAULT 0")
+    if 'memo' not in columns:
+        conn.execute("ALTER TABLE orders ADD COLUMN memo TEXT DEFAULT ''")
+
+@migration(3, "관리자 호출 메일 outbox 테이블 생성")
+def _create_notifications_outbox(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS notifications_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            station TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            coalesced INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at REAL NOT NULL,
+            next_attempt_at REAL NOT NULL,
+            claimed_at REAL,
+            sent_at REAL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_outbox_status ON notifications_outbox (status, next_attempt_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_outbox_station ON notifications_outbox (station, created_at)')
+
+@migration(4, "orders 데이터 버전 테이블 및 트리거 생성")
+def _create_data_version(conn):
+    # orders 테이블이 바뀔 때마다 버전이 1씩 증가합니다. 조회 페이지의 ETag 계산에 사용됩니다.
+    conn.execute("CREATE TABLE IF NOT EXISTS data_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)")
+    conn.execute("INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS orders_after_{event.lower()}_bump_version
+            AFTER {event} ON orders
+            BEGIN
+                UPDATE data_version SET version = version + 1 WHERE id = 1;
+            END
+        ''')
+
+@migration(5, "주문별 그룹화 조회용 인덱스 생성")
+def _create_order_lines_index(conn):
+    # 주문 번호별 GROUP BY를 정렬 없이 처리하고, 제품 행을 최신순(created_at DESC, id DESC)으로 읽기 위한 인덱스
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_order_lines ON orders (order_number, created_at DESC, id DESC)')
+
+@migration(6, "Dell 조회 대기 주문(pending_orders) 테이블 및 orders.pending 컬럼 추가")
+def _create_pending_orders(conn):
+    # Dell API를 사용할 수 없을 때 스캔한 주문은 pending=1인 임시 행으로 저장되고, 나중에 실제 제품 행으로 바뀝니다.
+    columns = [row['name'] for row in conn.execute("PRAGMA table_info(orders)").fetchall()]
+    if 'pending' not in columns:
+        conn.execute("ALTER TABLE orders ADD COLUMN pending INTEGER NOT NULL DEFAULT 0")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS pending_orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_number TEXT NOT NULL,
+            box TEXT,
+            reason TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            captured_at REAL NOT NULL,
+            next_attempt_at REAL NOT NULL,
+            claimed_at REAL,
+            resolved_at REAL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_pending_status ON pending_orders (status, next_attempt_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_pending_order_number ON pending_orders (order_number, status)')
+
+@migration(7, "OCR 단계별 처리 통계(ocr_stats) 테이블 생성")
+def _create_ocr_stats(conn):
+    # 바코드 인식 성공/실패 건수와 소요 시간, Textract 호출 시간 누적값 (바코드 우선 처리로 절약한 시간 계산용)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS ocr_stats (
+            name TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0,
+            total_ms REAL NOT NULL DEFAULT 0
+        )
+    ''')
+
+def latest_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def run_migrations():
+    """
+    아직 적용되지 않은 마이그레이션을 순서대로 실행하고, 적용 후 스키마 버전을 반환합니다.
+    이미 최신 버전이면 버전 번호만 확인하고 바로 반환합니다.
+    WSGI 서버의 워커가 시작되기 전에 마스터 프로세스에서 한 번만 호출해야 합니다 (gunicorn.conf.py 참고).
+    """
+    target = latest_version()
+    try:
+        with get_db_connection() as conn:
+            current = get_schema_version(conn)
+            if current >= target:
+                return current
+
+            # WAL 모드는 DB 파일에 영구 저장되며, 읽기 요청이 쓰기 요청에 막히지 않도록 합니다.
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # 잠금을 잡은 뒤 다시 확인합니다 (다른 프로세스가 먼저 마이그레이션했을 수 있음).
+                current = get_schema_version(conn)
+                for version, description, func in sorted(MIGRATIONS, key=lambda m: m[0]):
+                    if version <= current:
+                        continue
+                    logging.info(f"Applying migration {version}: {description}")
+                    func(conn)
+                    conn.execute(f"PRAGMA user_version = {int(version)}")
+                    current = version
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        logging.info(f"✅ Database schema is at version {current}.")
+        return current
+    except sqlite3.Error as e:
+        logging.error(f"Failed to run database migrations: {e}", exc_info=True)
+        raise
@@ -0,0 +1,175 @@
+import time
+import datetime
+import logging
+import threading
+
+import config
+import background
+from database import get_db_connection
+
+# 대기열이 비어 있을 때 새 메일을 확인하는 간격(초). 같은 프로세스의 요청은 이벤트로 즉시 깨웁니다.
+POLL_SECONDS = 5
+
+_wakeup = threading.Event()
+
+# --- Outbox ---
+
+def enqueue_admin_call(station):
+    """
+    관리자 호출 메일을 outbox에 추가하고 (notification_id, coalesced)를 반환합니다.
+    같은 스테이션이 NOTIFY_COALESCE_SECONDS 안에 이미 호출했고 그 메일이 아직 발송 전(pending/sending)이면
+    새 메일을 만들지 않고 기존 항목의 호출 횟수만 늘립니다. 이미 발송된 메일에는 합치지 않습니다.
+    """
+    now = time.time()
+    with get_db_connection() as conn:
+        conn.isolation_level = None
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                '''SELECT id FROM notifications_outbox
+                   WHERE station = ? AND created_at >= ? AND status IN ('pending', 'sending')
+                   ORDER BY id DESC LIMIT 1''',
+                (station, now - config.NOTIFY_COALESCE_SECONDS)
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE notifications_outbox SET coalesced = coalesced + 1 WHERE id = ?", (row['id'],))
+                conn.execute("COMMIT")
+                logging.info(f"Admin call from {station} coalesced into notification #{row['id']}")
+                return row['id'], True
+
+            body = (f"입고 스캔 처리 중 문제가 발생하여 호출드립니다.\n\n"
+                    f"요청자 IP: {station}\n"
+                    f"시간: {datetime.datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S')}")
+            cursor = conn.execute(
+                '''INSERT INTO notifications_outbox (station, subject, body, created_at, next_attempt_at)
+                   VALUES (?, ?, ?, ?, ?)''',
+                (station, "📡 입고 시스템 관리자 호출", body, now, now)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    logging.info(f"Admin call from {station} queued as notification #{cursor.lastrowid}")
+    ensure_sender_started()
+    _wakeup.set()
+    return cursor.lastrowid, False
+
+def _claim_next():
+    """발송할 메일 하나를 sending 상태로 바꾸고 반환합니다. 보낼 메일이 없으면 None입니다."""
+    claimed = background.claim_due("notifications_outbox", "sending", 1)
+    return claimed[0] if claimed else None
+
+def _mark_sent(notification_id):
+    with get_db_connection() as conn:
+        conn.execute(
+            "UPDATE notifications_outbox SET status = 'sent', sent_at = ?, last_error = NULL WHERE id = ?",
+            (time.time(), notification_id)
+        )
+        conn.commit()
+
+def _mark_failed(notification, error):
+    """발송 실패를 기록하고, 최대 시도 횟수 전까지는 지수 백오프로 재시도를 예약합니다."""
+    [(_, attempts, retrying)] = background.mark_failed(
+        "notifications_outbox", [notification], error, config.NOTIFY_MAX_ATTEMPTS, config.NOTIFY_RETRY_BASE_SECONDS
+    )
+    if retrying:
+        logging.warning(f"Notification #{notification['id']} failed (attempt {attempts}), will retry: {error}")
+    else:
+        logging.error(f"Notification #{notification['id']} failed permanently after {attempts} attempts: {error}")
+
+# --- SMTP ---
+
+class _SmtpConnection:
+    """발송 스레드가 재사용하는 SMTP 연결. 유휴 시간이 지나면 닫고, 끊겼으면 다시 연결합니다."""
+
+    def __init__(self):
+        self.server = None
+        self.last_used = 0.0
+
+    def _connect(self):
+        import smtplib
+        if config.SMTP_USE_SSL:
+            server = smtplib.SMTP_SSL(config.SMTP_HOST, config.SMTP_PORT, timeout=30)
+        else:
+            server = smtplib.SMTP(config.SMTP_HOST, config.SMTP_PORT, timeout=30)
+        if config.SENDER_PASSWORD:
+            server.login(config.SENDER_EMAIL, config.SENDER_PASSWORD)
+        logging.info(f"SMTP connection opened to {config.SMTP_HOST}:{config.SMTP_PORT}")
+        return server
+
+    def _is_alive(self):
+        try:
+            return self.server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def send(self, msg):
+        if self.server is not None and not self._is_alive():
+            self.close()
+        if self.server is None:
+            self.server = self._connect()
+        try:
+            self.server.send_message(msg)
+        except Exception:
+            # 연결 상태를 알 수 없으므로 다음 발송 때 새로 연결합니다.
+            self.close()
+            raise
+        self.last_used = time.time()
+
+    def close_if_idle(self):
+        if self.server is not None and time.time() - self.last_used > config.SMTP_IDLE_SECONDS:
+            self.close()
+
+    def close(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except Exception:
+            pass
+        self.server = None
+
+def _build_message(notification):
+    from email.mime.text import MIMEText
+
+    body = notification['body']
+    if notification['coalesced']:
+        body += f"\n\n같은 스테이션에서 {notification['coalesced']}회 추가 호출되었습니다."
+    msg = MIMEText(body)
+    msg['Subject'] = notification['subject']
+    msg['From'] = config.SENDER_EMAIL
+    msg['To'] = config.ADMIN_EMAIL
+    return msg
+
+def drain_outbox(smtp):
+    """보낼 수 있는 메일을 모두 발송하고, 발송 시도한 건수를 반환합니다."""
+    processed = 0
+    while True:
+        notification = _claim_next()
+        if notification is None:
+            return processed
+        processed += 1
+        try:
+            smtp.send(_build_message(notification))
+            _mark_sent(notification['id'])
+            logging.info(f"✅ Notification #{notification['id']} sent to admin.")
+        except Exception as e:
+            _mark_failed(notification, e)
+
+def _sender_loop():
+    smtp = _SmtpConnection()
+    while True:
+        _wakeup.clear()
+        try:
+            drain_outbox(smtp)
+        except Exception as e:
+            logging.error(f"Notification sender error: {e}", exc_info=True)
+        smtp.close_if_idle()
+        _wakeup.wait(POLL_SECONDS)
+
+_sender = background.BackgroundThread("notification-sender", _sender_loop)
+
+def ensure_sender_started():
+    """현재 프로세스에서 발송 스레드가 돌고 있지 않으면 시작합니다 (fork 이후 워커마다 하나씩)."""
+    _sender.ensure_started()
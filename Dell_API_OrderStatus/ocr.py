@@ -1,123 +1,305 @@
-import boto3
-from botocore.exceptions import BotoCoreError, ClientError
+import os
 import re
+import json
+import time
+import hashlib
 import logging
+import threading
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
-# 로깅 설정
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+import barcode_reader
+import config
+import rate_limit
 
-# AWS Textract 클라이언트 초기화
-textract_client = boto3.client('textract', region_name='ap-northeast-2')
+# AWS Textract 클라이언트는 처음 사용할 때 프로세스별로 생성합니다.
+# (import 시점에 만들면 fork된 워커들이 같은 연결 풀을 공유하게 됩니다.)
+# boto3는 import에만 100ms 이상 걸리므로 OCR을 실제로 사용할 때 불러옵니다.
+_textract_client = None
+_textract_client_pid = None
+_client_lock = threading.Lock()
 
-def extract_order_details_from_image(image_path):
+def get_textract_client():
+    """현재 프로세스 전용 Textract 클라이언트를 반환합니다."""
+    global _textract_client, _textract_client_pid
+    with _client_lock:
+        if _textract_client is None or _textract_client_pid != os.getpid():
+            import boto3
+            _textract_client = boto3.client('textract', region_name='ap-northeast-2')
+            _textract_client_pid = os.getpid()
+        return _textract_client
+
+def _fixture_path(fixture_key):
+    return os.path.join(config.OCR_FIXTURE_DIR, fixture_key + ".json")
+
+def _load_fixture(fixture_key):
+    """녹화된 Textract 응답을 읽어옵니다 (OCR_FIXTURE_MODE=replay)."""
+    with open(_fixture_path(fixture_key), encoding='utf-8') as f:
+        return json.load(f)
+
+def _save_fixture(fixture_key, response):
+    """Textract 응답을 재생용 fixture로 저장합니다 (OCR_FIXTURE_MODE=record)."""
+    os.makedirs(config.OCR_FIXTURE_DIR, exist_ok=True)
+    with open(_fixture_path(fixture_key), 'w', encoding='utf-8') as f:
+        json.dump({"Blocks": response.get('Blocks', [])}, f, ensure_ascii=False)
+
+def _detect_document_text(document_bytes, fixture_key=None):
+    """
+    Textract detect_document_text 호출. 재생 모드에서는 AWS를 호출하지 않고 저장된 응답을 사용합니다.
+    fixture 이름은 fixture_key, 없으면 문서 바이트의 SHA-256입니다.
+    """
+    fixture_key = fixture_key or hashlib.sha256(document_bytes).hexdigest()
+    if config.OCR_FIXTURE_MODE == "replay":
+        return _load_fixture(fixture_key)
+
+    rate_limit.acquire("textract")
+    started = time.perf_counter()
+    response = get_textract_client().detect_document_text(Document={'Bytes': document_bytes})
+    # 바코드 우선 처리로 절약한 시간을 계산하기 위해 실제 호출 시간을 기록합니다 (대기 시간 제외).
+    barcode_reader.record("textract", (time.perf_counter() - started) * 1000)
+    if config.OCR_FIXTURE_MODE == "record":
+        _save_fixture(fixture_key, response)
+    return response
+
+def parse_order_text(lines):
     """
-    Amazon Textract를 사용하여 이미지에서 주문 세부 정보를 추출합니다.
+    OCR로 인식한 텍스트 줄 목록에서 주문 번호와 박스 번호를 추출합니다.
     '납품확인서' 형식의 여러 주문 번호와 기존 라벨의 단일 주문 번호를 모두 처리합니다.
-    결과는 항상 사전 목록으로 반환됩니다.
     """
-    logging.info(f"Starting OCR process for image: {image_path}")
-    try:
-        with open(image_path, 'rb') as document:
-            image_bytes = document.read()
+    full_text = " ".join(lines)
+    logging.info(f"OCR extracted {len(lines)} line(s), {len(full_text)} chars")
+    logging.debug("Extracted text: '%s'", full_text)
 
-        if not image_bytes:
-            logging.error("Image file is empty.")
-            return [{"error": "Image file is empty."}]
+    # --- 다중 주문 추출 (납품확인서 형식) ---
+    if "ORDER#" in full_text:
+        results = []
+        logging.info("납품확인서 형식을 감지했습니다. 다중 주문 추출을 시도합니다.")
+        for line in lines:
+            # 라인에서 9자리 또는 10자리 주문 번호 탐색
+            order_match = re.search(r'\b([0-9]{9,10})\b', line)
+            if order_match:
+                order_number = order_match.group(1)
+                
+                # 같은 라인에서 박스 번호(1~3자리 숫자) 탐색
+                box_match = re.search(r'(Box|박스)\s*[:\s]*(\d{1,3})\b', line, re.IGNORECASE)
+                box_number = box_match.group(2) if box_match else None
+                
+                # 'Box' 키워드가 없는 경우, 주문 번호가 아닌 다른 숫자를 박스 번호로 간주
+                if not box_number:
+                    other_numbers = re.findall(r'\b(\d+)\b', line)
+                    for num in other_numbers:
+                        if num != order_number:
+                            box_number = num
+                            break # 첫 번째로 일치하는 다른 숫자를 박스 번호로 사용
 
-        response = textract_client.detect_document_text(Document={'Bytes': image_bytes})
+                results.append({"order_number": order_number, "box": box_number})
         
+        if results:
+            logging.info(f"납품확인서에서 {len(results)}개의 주문을 찾았습니다.")
+            return results
+
+    # --- 단일 주문 추출 (기존 라벨 형식) ---
+    logging.info("단일 주문 추출 로직을 사용합니다.")
+    order_number = None
+    
+    # 1. "Order No" 패턴
+    match = re.search(r"Order\s*No[:.\s#]*([0-9]{9,10})\b", full_text, re.IGNORECASE)
+    if match:
+        order_number = match.group(1)
+        logging.info(f"패턴 'Order No'를 사용하여 주문 번호를 찾았습니다: {order_number}")
+    
+    # 2. 가장 흔한 10자리 숫자 (Fallback)
+    if not order_number:
+        all_10_digit_numbers = re.findall(r"\b([0-9]{10})\b", full_text)
+        if all_10_digit_numbers:
+            counts = Counter(all_10_digit_numbers)
+            most_common = counts.most_common(1)
+            if most_common and most_common[0][1] > 0:
+                order_number = most_common[0][0]
+                logging.info(f"가장 흔한 10자리 숫자를 주문 번호로 찾았습니다: {order_number}")
+
+    if not order_number:
+        logging.warning("모든 패턴 시도 후에도 주문 번호를 찾지 못했습니다.")
+    
+    # --- Box 번호 추출 ---
+    # 'X of Y' 라벨에서 Y는 전체 박스 수(box), X는 이 라벨의 박스 번호(box_index)입니다.
+    box = None
+    box_index = None
+    match = re.search(r"(?:of|\/)\s*([0-9]+)\b", full_text, re.IGNORECASE)
+    if match:
+        box = match.group(1)
+        logging.info(f"패턴 'of Y'를 사용하여 Box 번호를 찾았습니다: {box}")
+        index_match = re.search(r"\b([0-9]{1,3})\s*(?:of|\/)\s*" + re.escape(box) + r"\b", full_text, re.IGNORECASE)
+        if index_match:
+            box_index = int(index_match.group(1))
+            logging.info(f"라벨의 박스 순번: {box_index} / {box}")
+    else:
+        match = re.search(r"Box\s*([0-9]+)\b", full_text, re.IGNORECASE)
+        if match:
+            box = match.group(1)
+            logging.info(f"패턴 'Box Y'를 사용하여 Box 번호를 찾았습니다: {box}")
+    
+    box_num = None
+    if box:
+        try:
+            box_num = int(box)
+            logging.info(f"최종 Box 번호: {box_num}")
+        except ValueError:
+            logging.warning(f"추출된 box 값 '{box}'는 유효한 정수가 아닙니다.")
+    
+    if not order_number:
+        return [] # 아무것도 찾지 못하면 빈 리스트 반환
+
+    return [{"order_number": order_number, "box": box_num, "box_index": box_index}]
+
+def _extract_from_bytes(document_bytes, source, fixture_key=None):
+    """이미지 또는 단일 페이지 PDF 바이트에서 주문 정보를 추출합니다. 결과는 항상 사전 목록으로 반환됩니다."""
+    from botocore.exceptions import BotoCoreError, ClientError
+
+    try:
+        if not document_bytes:
+            logging.error(f"Document is empty: {source}")
+            return [{"error": "Image file is empty."}]
+
+        response = _detect_document_text(document_bytes, fixture_key)
+
         blocks = response.get('Blocks', [])
         if not blocks:
-            logging.warning("Textract did not detect any text blocks.")
+            logging.warning(f"Textract did not detect any text blocks: {source}")
             return [{"error": "No text detected in image."}]
 
         lines = [block['Text'] for block in blocks if block.get('BlockType') == 'LINE']
-        full_text = " ".join(lines)
-        logging.info(f"Extracted text: '{full_text}'")
-
-        # --- 다중 주문 추출 (납품확인서 형식) ---
-        if "ORDER#" in full_text:
-            results = []
-            logging.info("납품확인서 형식을 감지했습니다. 다중 주문 추출을 시도합니다.")
-            for line in lines:
-                # 라인에서 9자리 또는 10자리 주문 번호 탐색
-                order_match = re.search(r'\b([0-9]{9,10})\b', line)
-                if order_match:
-                    order_number = order_match.group(1)
-                    
-                    # 같은 라인에서 박스 번호(1~3자리 숫자) 탐색
-                    box_match = re.search(r'(Box|박스)\s*[:\s]*(\d{1,3})\b', line, re.IGNORECASE)
-                    box_number = box_match.group(2) if box_match else None
-                    
-                    # 'Box' 키워드가 없는 경우, 주문 번호가 아닌 다른 숫자를 박스 번호로 간주
-                    if not box_number:
-                        other_numbers = re.findall(r'\b(\d+)\b', line)
-                        for num in other_numbers:
-                            if num != order_number:
-                                box_number = num
-                                break # 첫 번째로 일치하는 다른 숫자를 박스 번호로 사용
-
-                    results.append({"order_number": order_number, "box": box_number})
-            
-            if results:
-                logging.info(f"납품확인서에서 {len(results)}개의 주문을 찾았습니다.")
-                return results
-
-        # --- 단일 주문 추출 (기존 라벨 형식) ---
-        logging.info("단일 주문 추출 로직을 사용합니다.")
-        order_number = None
-        
-        # 1. "Order No" 패턴
-        match = re.search(r"Order\s*No[:.\s#]*([0-9]{9,10})\b", full_text, re.IGNORECASE)
-        if match:
-            order_number = match.group(1)
-            logging.info(f"패턴 'Order No'를 사용하여 주문 번호를 찾았습니다: {order_number}")
-        
-        # 2. 가장 흔한 10자리 숫자 (Fallback)
-        if not order_number:
-            all_10_digit_numbers = re.findall(r"\b([0-9]{10})\b", full_text)
-            if all_10_digit_numbers:
-                counts = Counter(all_10_digit_numbers)
-                most_common = counts.most_common(1)
-                if most_common and most_common[0][1] > 0:
-                    order_number = most_common[0][0]
-                    logging.info(f"가장 흔한 10자리 숫자를 주문 번호로 찾았습니다: {order_number}")
-
-        if not order_number:
-            logging.warning("모든 패턴 시도 후에도 주문 번호를 찾지 못했습니다.")
-        
-        # --- Box 번호 추출 ---
-        box = None
-        match = re.search(r"(?:of|\/)\s*([0-9]+)\b", full_text, re.IGNORECASE)
-        if match:
-            box = match.group(1)
-            logging.info(f"패턴 'of Y'를 사용하여 Box 번호를 찾았습니다: {box}")
-        else:
-            match = re.search(r"Box\s*([0-9]+)\b", full_text, re.IGNORECASE)
-            if match:
-                box = match.group(1)
-                logging.info(f"패턴 'Box Y'를 사용하여 Box 번호를 찾았습니다: {box}")
-        
-        box_num = None
-        if box:
-            try:
-                box_num = int(box)
-                logging.info(f"최종 Box 번호: {box_num}")
-            except ValueError:
-                logging.warning(f"추출된 box 값 '{box}'는 유효한 정수가 아닙니다.")
-        
-        if not order_number:
-            return [] # 아무것도 찾지 못하면 빈 리스트 반환
-
-        return [{"order_number": order_number, "box": box_num}]
+        return parse_order_text(lines)
 
+    except rate_limit.RateLimitTimeout as e:
+        logging.error(f"Textract 호출 대기 시간 초과: {e}")
+        return [{"error": "OCR 요청이 많아 처리하지 못했습니다. 잠시 후 다시 시도해주세요."}]
     except (BotoCoreError, ClientError) as e:
         logging.error(f"AWS Textract API 오류: {e}", exc_info=True)
         return [{"error": f"AWS Textract API 오류: {e}"}]
     except FileNotFoundError:
-        logging.error(f"이미지 파일을 찾을 수 없습니다: {image_path}")
-        return [{"error": "파일을 찾을 수 없습니다"}]
+        logging.error(f"OCR fixture를 찾을 수 없습니다: {source}")
+        return [{"error": "OCR 재생용 fixture를 찾을 수 없습니다"}]
     except Exception as e:
         logging.error(f"이미지 처리 중 예상치 못한 오류 발생: {e}", exc_info=True)
         return [{"error": "이미지 처리 중 예상치 못한 오류가 발생했습니다"}]
+
+def extract_order_details_from_image(image_path):
+    """
+    이미지에서 주문 세부 정보를 추출합니다. 결과는 항상 사전 목록으로 반환됩니다.
+    박스 라벨의 바코드에서 주문 번호와 박스 순번을 모두 읽으면 Textract를 호출하지 않고,
+    그 외에는 Amazon Textract를 사용합니다. Textract가 주문 번호를 찾지 못했을 때만 바코드의 주문 번호를
+    박스 미확인(box_unknown) 상태로 사용합니다.
+    """
+    logging.info(f"Starting OCR process for image: {image_path}")
+    try:
+        with open(image_path, 'rb') as document:
+            image_bytes = document.read()
+    except FileNotFoundError:
+        logging.error(f"이미지 파일을 찾을 수 없습니다: {image_path}")
+        return [{"error": "파일을 찾을 수 없습니다"}]
+
+    label = None
+    if config.BARCODE_FAST_PATH and image_bytes:
+        label = barcode_reader.decode_label(image_bytes, image_path)
+        if label and label["box_index"] is not None:
+            return [label]
+
+    results = _extract_from_bytes(image_bytes, image_path)
+    if label and not any(result.get("order_number") for result in results):
+        errors = [result["error"] for result in results if result.get("error")]
+        logging.warning(f"Textract found no order number in {image_path} {errors or ''}; "
+                        f"using barcode order {label['order_number']} with unknown box.")
+        return [dict(label, box_unknown=True)]
+    return results
+
+class PdfTooManyPagesError(Exception):
+    """PDF 페이지 수가 OCR_PDF_MAX_PAGES를 넘을 때 발생합니다."""
+    def __init__(self, page_count, max_pages):
+        super().__init__(f"PDF has {page_count} pages (max {max_pages})")
+        self.page_count = page_count
+        self.max_pages = max_pages
+
+def split_pdf_pages(pdf_bytes, max_pages=None):
+    """
+    PDF를 페이지별 단일 페이지 PDF 바이트 목록으로 나눕니다 (Textract 동기 API는 한 페이지씩만 처리합니다).
+    max_pages보다 페이지가 많으면 분할하기 전에 PdfTooManyPagesError를 발생시킵니다.
+    """
+    import io
+    from pypdf import PdfReader, PdfWriter
+
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    if max_pages is not None and len(reader.pages) > max_pages:
+        raise PdfTooManyPagesError(len(reader.pages), max_pages)
+    pages = []
+    for page in reader.pages:
+        writer = PdfWriter()
+        writer.add_page(page)
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        pages.append(buffer.getvalue())
+    return pages
+
+def merge_page_results(page_results):
+    """
+    페이지별 OCR 결과를 합치고 (주문 번호, 박스) 기준으로 중복을 제거합니다.
+    같은 주문이 박스 번호와 함께 인식된 적이 있으면, 박스 번호 없이 인식된 결과는 버립니다.
+    """
+    merged = {}
+    errors = []
+    for page_number, results in enumerate(page_results, start=1):
+        for result in results:
+            if result.get("error"):
+                errors.append({"error": f"{page_number}페이지: {result['error']}"})
+                continue
+            order_number = result.get("order_number")
+            if order_number:
+                merged.setdefault((order_number, result.get("box")), result)
+
+    orders_with_box = {order_number for order_number, box in merged if box is not None}
+    unique_results = [
+        result for (order_number, box), result in merged.items()
+        if box is not None or order_number not in orders_with_box
+    ]
+    return unique_results + errors
+
+def extract_order_details_from_pdf(pdf_path):
+    """
+    여러 페이지로 된 납품확인서 PDF를 페이지별로 나누어 병렬로 OCR하고,
+    결과를 합쳐 중복을 제거한 사전 목록을 반환합니다.
+    """
+    logging.info(f"Starting OCR process for PDF: {pdf_path}")
+    try:
+        with open(pdf_path, 'rb') as document:
+            pdf_bytes = document.read()
+    except FileNotFoundError:
+        logging.error(f"PDF 파일을 찾을 수 없습니다: {pdf_path}")
+        return [{"error": "파일을 찾을 수 없습니다"}]
+    try:
+        pages = split_pdf_pages(pdf_bytes, max_pages=config.OCR_PDF_MAX_PAGES)
+    except PdfTooManyPagesError as e:
+        logging.warning(f"Rejected PDF {pdf_path}: {e}")
+        return [{"error": f"PDF가 {e.page_count}페이지입니다. 한 번에 최대 {e.max_pages}페이지까지 처리할 수 있으니 나누어 업로드해 주세요."}]
+    except ImportError:
+        logging.error("PDF 처리를 위해 pypdf 패키지가 필요합니다.")
+        return [{"error": "서버에 PDF 처리 기능이 설치되어 있지 않습니다."}]
+    except Exception as e:
+        logging.error(f"PDF 페이지 분할 실패: {e}", exc_info=True)
+        return [{"error": "PDF 파일을 읽을 수 없습니다"}]
+
+    if not pages:
+        return [{"error": "PDF에 페이지가 없습니다."}]
+
+    # 페이지 fixture 이름은 원본 PDF 해시와 페이지 번호로 정합니다.
+    # 분할된 페이지 바이트는 pypdf 버전에 따라 달라지므로 이름에 쓰지 않습니다.
+    pdf_hash = hashlib.sha256(pdf_bytes).hexdigest()
+    logging.info(f"PDF has {len(pages)} page(s); running OCR with up to {config.OCR_PDF_WORKERS} workers.")
+    with ThreadPoolExecutor(max_workers=min(config.OCR_PDF_WORKERS, len(pages))) as executor:
+        page_results = list(executor.map(
+            lambda item: _extract_from_bytes(item[1], f"{pdf_path}#page={item[0]}", f"{pdf_hash}-p{item[0]}"),
+            enumerate(pages, start=1)
+        ))
+
+    results = merge_page_results(page_results)
+    logging.info(f"PDF OCR found {sum(1 for r in results if not r.get('error'))} unique order(s) across {len(pages)} page(s).")
+    return results
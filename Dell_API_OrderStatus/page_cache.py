@@ -0,0 +1,78 @@
+import os
+import hashlib
+import functools
+import threading
+from collections import OrderedDict
+
+from flask import current_app, g, request, make_response
+
+import config
+import database
+
+# 렌더링된 페이지 캐시 (키: ETag). 데이터 버전이 키에 포함되므로 데이터가 바뀌면 옛 항목은 자연스럽게 밀려납니다.
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_template_stamp = None
+
+def _get_template_stamp():
+    """템플릿 파일 수정 시각으로 만든 값. 배포로 템플릿이 바뀌면 브라우저의 이전 ETag가 무효화됩니다."""
+    global _template_stamp
+    if _template_stamp is None:
+        template_dir = os.path.join(current_app.root_path, current_app.template_folder)
+        mtimes = sorted(
+            (name, os.path.getmtime(os.path.join(template_dir, name)))
+            for name in os.listdir(template_dir)
+        )
+        _template_stamp = hashlib.sha1(repr(mtimes).encode()).hexdigest()[:12]
+    return _template_stamp
+
+def _page_etag(version):
+    args = sorted(request.args.items(multi=True))
+    key = f"{_get_template_stamp()}:{version}:{request.path}:{args}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+def _cache_get(etag):
+    with _cache_lock:
+        body = _cache.get(etag)
+        if body is not None:
+            _cache.move_to_end(etag)
+        return body
+
+def _cache_put(etag, body):
+    with _cache_lock:
+        _cache[etag] = body
+        _cache.move_to_end(etag)
+        while len(_cache) > config.RENDER_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+def conditional_page(view):
+    """
+    조회 페이지용 데코레이터. orders 데이터 버전과 요청 경로/인자로 ETag를 만들어
+    변경이 없으면 304 Not Modified를, 캐시된 렌더링 결과가 있으면 DB 조회 없이 그대로 반환합니다.
+    문자열(렌더링된 HTML)을 반환하는 뷰에만 캐시가 적용되며, 리다이렉트 등은 그대로 통과합니다.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        version = database.get_data_version()
+        # 프로파일링을 요청한 경우에는 실제 조회/렌더링 시간을 재야 하므로 캐시를 건너뜁니다.
+        if version is None or g.get('profile_forced'):
+            return view(*args, **kwargs)
+
+        etag = _page_etag(version)
+        if etag in request.if_none_match:
+            response = make_response('', 304)
+        else:
+            body = _cache_get(etag)
+            if body is None:
+                rv = view(*args, **kwargs)
+                if not isinstance(rv, str):
+                    return rv
+                body = rv
+                _cache_put(etag, body)
+            response = make_response(body)
+
+        response.set_etag(etag)
+        # 브라우저가 매번 서버에 재검증하도록 합니다 (변경이 없으면 304로 빠르게 응답).
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return wrapper
@@ -0,0 +1,274 @@
+import os
+import io
+import sys
+import hmac
+import json
+import hashlib
+import time
+import random
+import logging
+import datetime
+import threading
+
+from flask import Blueprint, Response, abort, g, jsonify, redirect, render_template, request, session, url_for
+
+import config
+
+profiles_bp = Blueprint('profiles', __name__, url_prefix='/admin/profiles')
+
+FLAG_HEADER = 'X-Profile'
+FLAG_ARG = '_profile'
+# 관리자 인증: 요청마다 X-Admin-Token 헤더를 보내거나, 브라우저에서 /admin/profiles?token=... 으로 한 번 로그인합니다.
+ADMIN_TOKEN_HEADER = 'X-Admin-Token'
+ADMIN_TOKEN_ARG = 'token'
+ADMIN_SESSION_KEY = 'profile_admin'
+# 목록/상세 화면에 보여줄 함수 수
+TOP_FUNCTIONS = 30
+# 다른 워커가 바꾼 샘플링 비율을 다시 읽는 간격(초)
+SETTINGS_CHECK_SECONDS = 5
+
+_settings_lock = threading.Lock()
+_settings = {"sample_rate": None, "mtime": None, "checked_at": 0.0}
+
+# --- Settings ---
+
+def _settings_path():
+    return os.path.join(config.PROFILE_DIR, "settings.json")
+
+def get_sample_rate():
+    """
+    현재 샘플링 비율. 관리자 페이지에서 바꾼 값은 PROFILE_DIR/settings.json에 저장되어
+    모든 워커가 파일 수정 시각을 확인해 다시 읽습니다. 파일이 없으면 config.PROFILE_SAMPLE_RATE를 사용합니다.
+    """
+    now = time.time()
+    with _settings_lock:
+        if now - _settings["checked_at"] < SETTINGS_CHECK_SECONDS and _settings["sample_rate"] is not None:
+            return _settings["sample_rate"]
+        _settings["checked_at"] = now
+        try:
+            mtime = os.path.getmtime(_settings_path())
+        except OSError:
+            _settings["sample_rate"], _settings["mtime"] = config.PROFILE_SAMPLE_RATE, None
+            return _settings["sample_rate"]
+        if mtime != _settings["mtime"]:
+            try:
+                with open(_settings_path(), encoding='utf-8') as f:
+                    _settings["sample_rate"] = float(json.load(f)["sample_rate"])
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f"Invalid profiling settings file, using default sample rate: {e}")
+                _settings["sample_rate"] = config.PROFILE_SAMPLE_RATE
+            _settings["mtime"] = mtime
+        return _settings["sample_rate"]
+
+def set_sample_rate(rate):
+    os.makedirs(config.PROFILE_DIR, exist_ok=True)
+    tmp_path = _settings_path() + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"sample_rate": rate}, f)
+    os.replace(tmp_path, _settings_path())
+    with _settings_lock:
+        _settings["checked_at"] = 0.0
+    logging.info(f"Profiling sample rate set to {rate}")
+
+# --- Admin auth ---
+
+def _token_fingerprint():
+    # 세션에는 토큰 자체 대신 해시를 저장하므로, 토큰을 바꾸면 기존 로그인도 무효가 됩니다.
+    return hashlib.sha256(config.PROFILE_ADMIN_TOKEN.encode()).hexdigest()[:16]
+
+def _token_matches(value):
+    return bool(config.PROFILE_ADMIN_TOKEN) and value is not None and \
+        hmac.compare_digest(value.encode(), config.PROFILE_ADMIN_TOKEN.encode())
+
+def is_admin():
+    """관리자 토큰을 헤더로 보냈거나, 이 세션에서 토큰으로 로그인했는지 확인합니다."""
+    if not config.PROFILE_ADMIN_TOKEN:
+        return False
+    return _token_matches(request.headers.get(ADMIN_TOKEN_HEADER)) or \
+        session.get(ADMIN_SESSION_KEY) == _token_fingerprint()
+
+@profiles_bp.before_request
+def _require_admin():
+    if not config.PROFILE_ADMIN_TOKEN:
+        abort(404)
+    token = request.args.get(ADMIN_TOKEN_ARG)
+    if token is not None:
+        if not _token_matches(token):
+            abort(403)
+        session[ADMIN_SESSION_KEY] = _token_fingerprint()
+        # 토큰이 주소창과 방문 기록에 남지 않도록 인자를 뺀 주소로 이동합니다.
+        return redirect(url_for(request.endpoint, **request.view_args))
+    if not is_admin():
+        abort(403)
+
+# --- Request hooks ---
+
+def is_forced():
+    """
+    관리자가 헤더나 쿼리 인자로 이 요청의 프로파일링을 요청했는지 확인합니다.
+    강제 프로파일링은 디스크에 파일을 쓰고 페이지 캐시를 건너뛰므로 관리자만 사용할 수 있습니다.
+    """
+    if request.headers.get(FLAG_HEADER) != '1' and request.args.get(FLAG_ARG) != '1':
+        return False
+    return is_admin()
+
+def _start_profile():
+    if request.blueprint == profiles_bp.name or request.endpoint == 'static':
+        return
+    forced = is_forced()
+    if not forced:
+        rate = get_sample_rate()
+        if rate <= 0 or random.random() >= rate:
+            return
+
+    # cProfile은 현재 스레드만 측정하도록 만들어졌지만, Python 3.12+에서는 sys.monitoring 기반이라
+    # 프로세스 전체에 적용됩니다. gthread 워커에서는 같은 시간에 처리된 다른 요청의 함수도 섞여 기록될 수 있습니다.
+    import cProfile
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError as e:
+        # Python 3.12+에서는 다른 스레드가 이미 프로파일링 중이면 동시에 켤 수 없습니다.
+        logging.info(f"Skipping profile for {request.path}: {e}")
+        return
+    g.profile = profile
+    g.profile_forced = forced
+    g.profile_started = time.perf_counter()
+
+def _finish_profile(response):
+    profile = g.pop('profile', None)
+    if profile is None:
+        return response
+    profile.disable()
+    duration_ms = (time.perf_counter() - g.profile_started) * 1000
+    if g.profile_forced or duration_ms >= config.PROFILE_SLOW_MS:
+        try:
+            profile_id = _save_profile(profile, duration_ms, response.status_code)
+            response.headers['X-Profile-Id'] = profile_id
+        except Exception as e:
+            logging.error(f"Failed to save request profile: {e}", exc_info=True)
+    return response
+
+def init_app(app):
+    """요청 프로파일링 훅과 관리자 페이지를 등록합니다."""
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    app.register_blueprint(profiles_bp)
+
+# --- Storage ---
+
+def _top_functions(profile, limit=TOP_FUNCTIONS):
+    """누적 시간 기준 상위 함수 목록."""
+    import pstats
+    stats = pstats.Stats(profile)
+    rows = []
+    for (filename, lineno, name), (cc, ncalls, tottime, cumtime, _) in stats.stats.items():
+        # flask/app.py와 이 프로젝트의 app.py를 구분할 수 있도록 상위 디렉터리 이름까지 표시합니다.
+        short_name = os.path.join(os.path.basename(os.path.dirname(filename)), os.path.basename(filename))
+        rows.append({
+            "function": f"{short_name}:{lineno}({name})" if lineno else name,
+            "ncalls": ncalls,
+            "tottime_ms": round(tottime * 1000, 2),
+            "cumtime_ms": round(cumtime * 1000, 2),
+        })
+    rows.sort(key=lambda row: row["cumtime_ms"], reverse=True)
+    return rows[:limit]
+
+def _save_profile(profile, duration_ms, status_code):
+    """프로파일을 PROFILE_DIR에 pstats 파일(.prof)과 요약(.json)으로 저장하고 ID를 반환합니다."""
+    os.makedirs(config.PROFILE_DIR, exist_ok=True)
+    now = datetime.datetime.now()
+    profile_id = f"{now.strftime('%Y%m%d-%H%M%S-%f')}-{os.getpid()}"
+    profile.dump_stats(os.path.join(config.PROFILE_DIR, profile_id + ".prof"))
+    meta = {
+        "id": profile_id,
+        "created_at": now.strftime('%Y-%m-%d %H:%M:%S'),
+        "method": request.method,
+        "path": request.full_path.rstrip('?'),
+        "status": status_code,
+        "duration_ms": round(duration_ms, 1),
+        "reason": "flag" if g.profile_forced else "sampled",
+        "top": _top_functions(profile),
+    }
+    with open(os.path.join(config.PROFILE_DIR, profile_id + ".json"), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    logging.info(f"Saved request profile {profile_id} ({request.method} {request.path}, {duration_ms:.0f}ms)")
+    _prune()
+    return profile_id
+
+def _prune():
+    """가장 최근 PROFILE_KEEP개만 남기고 오래된 프로파일을 삭제합니다."""
+    ids = sorted(name[:-5] for name in os.listdir(config.PROFILE_DIR) if name.endswith(".json") and name != "settings.json")
+    for profile_id in ids[:max(len(ids) - config.PROFILE_KEEP, 0)]:
+        for ext in (".json", ".prof"):
+            try:
+                os.remove(os.path.join(config.PROFILE_DIR, profile_id + ext))
+            except OSError:
+                pass
+
+def list_profiles(limit=None):
+    """저장된 프로파일 요약을 최신순으로 반환합니다."""
+    if not os.path.isdir(config.PROFILE_DIR):
+        return []
+    names = sorted((n for n in os.listdir(config.PROFILE_DIR) if n.endswith(".json") and n != "settings.json"), reverse=True)
+    profiles = []
+    for name in names[:limit]:
+        try:
+            with open(os.path.join(config.PROFILE_DIR, name), encoding='utf-8') as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+def _profile_path(profile_id, ext):
+    # 경로 조작을 막기 위해 ID 형식만 허용합니다.
+    if not profile_id.replace('-', '').isdigit():
+        abort(404)
+    path = os.path.join(config.PROFILE_DIR, profile_id + ext)
+    if not os.path.exists(path):
+        abort(404)
+    return path
+
+# --- Admin pages ---
+
+@profiles_bp.route('/', methods=['GET'])
+def index():
+    """최근 프로파일 목록과 샘플링 설정 화면."""
+    return render_template(
+        'profiles.html',
+        profiles=list_profiles(limit=config.PROFILE_KEEP),
+        sample_rate=get_sample_rate(),
+        slow_ms=config.PROFILE_SLOW_MS,
+        flag_header=FLAG_HEADER,
+        flag_arg=FLAG_ARG,
+        admin_header=ADMIN_TOKEN_HEADER,
+        process_wide=sys.version_info >= (3, 12)
+    )
+
+@profiles_bp.route('/settings', methods=['POST'])
+def update_settings():
+    try:
+        rate = float(request.form.get('sample_rate', ''))
+    except ValueError:
+        return jsonify({"error": "sample_rate는 0~1 사이의 숫자여야 합니다."}), 400
+    if not 0 <= rate <= 1:
+        return jsonify({"error": "sample_rate는 0~1 사이의 숫자여야 합니다."}), 400
+    set_sample_rate(rate)
+    return redirect(url_for('profiles.index'))
+
+@profiles_bp.route('/<profile_id>', methods=['GET'])
+def detail(profile_id):
+    """pstats 텍스트 보고서 (누적 시간 순)."""
+    import pstats
+    stream = io.StringIO()
+    stats = pstats.Stats(_profile_path(profile_id, ".prof"), stream=stream)
+    stats.sort_stats('cumulative').print_stats(60)
+    return Response(stream.getvalue(), mimetype='text/plain; charset=utf-8')
+
+@profiles_bp.route('/<profile_id>.prof', methods=['GET'])
+def download(profile_id):
+    """snakeviz 등으로 열어볼 수 있는 원본 pstats 파일."""
+    with open(_profile_path(profile_id, ".prof"), 'rb') as f:
+        data = f.read()
+    return Response(data, mimetype='application/octet-stream',
+                    headers={'Content-Disposition': f'attachment; filename={profile_id}.prof'})
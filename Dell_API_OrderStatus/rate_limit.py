@@ -0,0 +1,178 @@
+import uuid
+import sqlite3
+import time
+import logging
+from contextlib import contextmanager
+
+import config
+
+# --- Custom Exceptions ---
+class RateLimitTimeout(Exception):
+    """Raised when a token could not be acquired within the allowed wait time."""
+    pass
+
+# 대기 행의 만료 여유 시간(초). 대기 중인 호출자는 잠들기 전마다 expires_at을 (대기 시간 + 이 값)으로 연장합니다.
+WAITER_GRACE_SECONDS = 5
+
+@contextmanager
+def _get_connection():
+    """버킷 저장소 연결을 제공합니다. 각 호출마다 새 연결을 열기 때문에 스레드/프로세스 간에 안전합니다."""
+    conn = sqlite3.connect(config.RATE_LIMIT_DB_PATH, timeout=10, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS buckets (
+                name TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                acquired INTEGER NOT NULL DEFAULT 0,
+                waited INTEGER NOT NULL DEFAULT 0,
+                timeouts INTEGER NOT NULL DEFAULT 0,
+                total_wait_seconds REAL NOT NULL DEFAULT 0,
+                last_wait_seconds REAL NOT NULL DEFAULT 0,
+                max_wait_seconds REAL NOT NULL DEFAULT 0
+            )
+        ''')
+        # 대기 중인 호출자. 대기하는 동안 expires_at을 계속 연장하므로, 프로세스가 죽어 정리되지 못한 행은 곧 만료됩니다.
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS waiters (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        ''')
+        yield conn
+    finally:
+        conn.close()
+
+def _load_bucket(conn, name, burst, now):
+    """버킷 행을 읽어오고, 없으면 가득 찬 상태로 생성합니다."""
+    row = conn.execute("SELECT * FROM buckets WHERE name = ?", (name,)).fetchone()
+    if row is None:
+        conn.execute("INSERT INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?)", (name, float(burst), now))
+        row = conn.execute("SELECT * FROM buckets WHERE name = ?", (name,)).fetchone()
+    return row
+
+def _record_acquired(conn, name, tokens, now, waited_seconds, was_queued):
+    conn.execute('''
+        UPDATE buckets
+        SET tokens = ?, updated_at = ?,
+            acquired = acquired + 1,
+            waited = waited + ?,
+            total_wait_seconds = total_wait_seconds + ?,
+            last_wait_seconds = ?,
+            max_wait_seconds = MAX(max_wait_seconds, ?)
+        WHERE name = ?
+    ''', (tokens, now, int(was_queued), waited_seconds, waited_seconds, waited_seconds, name))
+
+def _leave_queue(waiter_id):
+    """대기열에서 호출자를 제거합니다. 실패해도 행은 expires_at이 지나면 대기열 길이에서 빠집니다."""
+    try:
+        with _get_connection() as conn:
+            conn.execute("DELETE FROM waiters WHERE id = ?", (waiter_id,))
+    except sqlite3.Error as e:
+        logging.warning(f"Failed to remove rate limit waiter {waiter_id}: {e}")
+
+def _record_timeout(name):
+    try:
+        with _get_connection() as conn:
+            conn.execute("UPDATE buckets SET timeouts = timeouts + 1 WHERE name = ?", (name,))
+    except sqlite3.Error as e:
+        logging.warning(f"Failed to record rate limit timeout for '{name}': {e}")
+
+def acquire(name, max_wait=None):
+    """
+    지정한 버킷에서 토큰 하나를 가져옵니다. 토큰이 없으면 충전될 때까지 대기합니다.
+    대기 시간이 max_wait(기본값: config.RATE_LIMIT_MAX_WAIT)를 넘으면 RateLimitTimeout을 발생시킵니다.
+    실제로 대기한 시간(초)을 반환합니다.
+    """
+    rate, burst = config.RATE_LIMITS[name]
+    max_wait = config.RATE_LIMIT_MAX_WAIT if max_wait is None else max_wait
+    started = time.time()
+    waiter_id = None
+
+    try:
+        while True:
+            now = time.time()
+            try:
+                with _get_connection() as conn:
+                    # BEGIN IMMEDIATE로 쓰기 잠금을 먼저 잡아 다른 프로세스와 동시에 토큰을 소비하지 않도록 합니다.
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        row = _load_bucket(conn, name, burst, now)
+                        tokens = min(float(burst), row['tokens'] + max(now - row['updated_at'], 0) * rate)
+
+                        if tokens >= 1:
+                            waited_seconds = now - started
+                            queued = waiter_id is not None
+                            _record_acquired(conn, name, tokens - 1, now, waited_seconds, queued)
+                            if queued:
+                                conn.execute("DELETE FROM waiters WHERE id = ?", (waiter_id,))
+                            conn.execute("COMMIT")
+                            waiter_id = None
+                            if queued:
+                                logging.info(f"Rate limit '{name}': acquired after waiting {waited_seconds:.2f}s")
+                            return waited_seconds
+
+                        sleep_for = (1 - tokens) / rate
+                        waiter_id = waiter_id or uuid.uuid4().hex
+                        conn.execute("UPDATE buckets SET tokens = ?, updated_at = ? WHERE name = ?", (tokens, now, name))
+                        conn.execute(
+                            "INSERT OR REPLACE INTO waiters (id, name, expires_at) VALUES (?, ?, ?)",
+                            (waiter_id, name, now + sleep_for + WAITER_GRACE_SECONDS)
+                        )
+                        conn.execute("COMMIT")
+                    except Exception:
+                        conn.execute("ROLLBACK")
+                        raise
+            except sqlite3.Error as e:
+                # 저장소 장애로 업무 흐름 전체가 멈추지 않도록, 제한 없이 통과시킵니다.
+                logging.warning(f"Rate limit store unavailable for '{name}', proceeding without limit: {e}")
+                return time.time() - started
+
+            remaining = max_wait - (time.time() - started)
+            if sleep_for > remaining:
+                _record_timeout(name)
+                raise RateLimitTimeout(f"Rate limit '{name}' exceeded; no token available within {max_wait:.0f}s.")
+            time.sleep(sleep_for)
+    finally:
+        # 시간 초과, 저장소 장애, 예외 등 어떤 경로로 나가더라도 대기열에서 빠집니다.
+        if waiter_id is not None:
+            _leave_queue(waiter_id)
+
+def get_stats():
+    """각 버킷의 현재 토큰 수, 대기열 길이, 대기 시간 통계를 반환합니다."""
+    stats = {}
+    now = time.time()
+    try:
+        with _get_connection() as conn:
+            rows = {row['name']: row for row in conn.execute("SELECT * FROM buckets").fetchall()}
+            queue_depths = {row['name']: row['count'] for row in conn.execute(
+                "SELECT name, COUNT(*) AS count FROM waiters WHERE expires_at > ? GROUP BY name", (now,)
+            ).fetchall()}
+    except sqlite3.Error as e:
+        logging.error(f"Failed to read rate limit stats: {e}", exc_info=True)
+        rows, queue_depths = {}, {}
+
+    for name, (rate, burst) in config.RATE_LIMITS.items():
+        row = rows.get(name)
+        if row is None:
+            stats[name] = {"rate_per_second": rate, "burst": burst, "tokens": float(burst), "queue_depth": 0,
+                           "acquired": 0, "waited": 0, "timeouts": 0,
+                           "avg_wait_seconds": 0.0, "last_wait_seconds": 0.0, "max_wait_seconds": 0.0}
+            continue
+        tokens = min(float(burst), row['tokens'] + max(now - row['updated_at'], 0) * rate)
+        stats[name] = {
+            "rate_per_second": rate,
+            "burst": burst,
+            "tokens": round(tokens, 2),
+            "queue_depth": queue_depths.get(name, 0),
+            "acquired": row['acquired'],
+            "waited": row['waited'],
+            "timeouts": row['timeouts'],
+            "avg_wait_seconds": round(row['total_wait_seconds'] / row['waited'], 3) if row['waited'] else 0.0,
+            "last_wait_seconds": round(row['last_wait_seconds'], 3),
+            "max_wait_seconds": round(row['max_wait_seconds'], 3),
+        }
+    return stats
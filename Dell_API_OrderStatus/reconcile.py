@@ -0,0 +1,193 @@
+import time
+import datetime
+import logging
+import threading
+
+import config
+import dell_api
+import background
+from database import get_db_connection
+
+# 대기 주문의 임시 제품 행 (Dell 조회가 끝나면 실제 제품 행으로 바뀝니다)
+PENDING_PO_NUMBER = "Dell 조회 대기"
+PENDING_DESCRIPTION = "Dell 조회 대기 중 (자동 재조회)"
+
+_wakeup = threading.Event()
+
+# --- Capture ---
+
+def pending_order_details(order_number, box, reason):
+    """
+    Dell 조회 없이 접수할 주문 정보 (결과 화면/세션용).
+    reason: forced(작업자가 오프라인 접수 선택) / token_unavailable / lookup_failed
+    """
+    return {
+        "order_number": order_number,
+        "purchase_order_number": PENDING_PO_NUMBER,
+        "products": [{"description": PENDING_DESCRIPTION, "itemQuantity": 0}],
+        "box": box,
+        "pending": True,
+        "capture_reason": reason,
+    }
+
+def capture_orders(orders):
+    """
+    pending_order_details()로 만든 주문을 Dell 조회 없이 바로 저장하고, 저장한 주문 수를 반환합니다.
+    orders에는 pending=1인 임시 행을, pending_orders에는 재조회 항목을 추가합니다.
+    같은 날 이미 접수된 주문은 다시 추가하지 않습니다.
+    """
+    today_date = datetime.date.today().strftime('%Y-%m-%d')
+    now = time.time()
+    captured = 0
+    with get_db_connection() as conn:
+        for order in orders:
+            order_number, box, reason = order['order_number'], order['box'], order['capture_reason']
+            exists = conn.execute(
+                "SELECT 1 FROM orders WHERE order_number = ? AND pending = 1 AND created_at = ?",
+                (order_number, today_date)
+            ).fetchone()
+            if exists:
+                continue
+            conn.execute(
+                '''INSERT INTO orders (order_number, purchase_order_number, product_description, quantity, box, created_at, pending)
+                   VALUES (?, ?, ?, 0, ?, ?, 1)''',
+                (order_number, PENDING_PO_NUMBER, PENDING_DESCRIPTION, box, today_date)
+            )
+            # 작업자가 직접 오프라인 접수한 경우는 바로, API 장애로 접수된 경우는 잠시 후에 조회합니다.
+            delay = 0 if reason == "forced" else config.RECONCILE_RETRY_BASE_SECONDS
+            conn.execute(
+                "INSERT INTO pending_orders (order_number, box, reason, captured_at, next_attempt_at) VALUES (?, ?, ?, ?, ?)",
+                (order_number, box, reason, now, now + delay)
+            )
+            captured += 1
+        conn.commit()
+    logging.info(f"Captured {captured} order(s) for later Dell lookup.")
+    ensure_worker_started()
+    _wakeup.set()
+    return captured
+
+# --- Reconciliation ---
+
+def _claim_batch():
+    """재조회할 대기 주문을 최대 RECONCILE_BATCH_SIZE개 resolving 상태로 바꾸고 반환합니다."""
+    return background.claim_due("pending_orders", "resolving", config.RECONCILE_BATCH_SIZE)
+
+def _mark_failed(entries, error):
+    """조회 실패를 기록하고, 최대 시도 횟수 전까지는 지수 백오프로 재시도를 예약합니다."""
+    outcomes = background.mark_failed(
+        "pending_orders", entries, error, config.RECONCILE_MAX_ATTEMPTS, config.RECONCILE_RETRY_BASE_SECONDS
+    )
+    retrying_count = 0
+    for entry, attempts, retrying in outcomes:
+        if retrying:
+            retrying_count += 1
+        else:
+            logging.error(f"Pending order {entry['order_number']} could not be resolved after {attempts} attempts: {error}")
+    if retrying_count:
+        logging.warning(f"Dell lookup failed for {retrying_count} pending order(s), will retry: {error}")
+
+def _resolve(conn, entry, details):
+    """임시 행을 Dell 조회 결과의 제품 행으로 바꿉니다. 출고 상태와 메모는 임시 행의 값을 유지합니다."""
+    placeholders = conn.execute(
+        "SELECT id, created_at, box, shipped, memo FROM orders WHERE order_number = ? AND pending = 1",
+        (entry['order_number'],)
+    ).fetchall()
+    for row in placeholders:
+        conn.execute("DELETE FROM orders WHERE id = ?", (row['id'],))
+        for product in details['products']:
+            duplicate = conn.execute(
+                "SELECT 1 FROM orders WHERE order_number = ? AND product_description = ? AND created_at = ?",
+                (entry['order_number'], product.get('description'), row['created_at'])
+            ).fetchone()
+            if duplicate:
+                continue
+            conn.execute(
+                '''INSERT INTO orders (order_number, purchase_order_number, product_description, quantity, box, created_at, shipped, memo)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                (entry['order_number'], details.get('purchase_order_number'), product.get('description'),
+                 product.get('itemQuantity'), row['box'], row['created_at'], row['shipped'], row['memo'])
+            )
+    conn.execute(
+        "UPDATE pending_orders SET status = 'resolved', resolved_at = ?, attempts = attempts + 1, last_error = NULL WHERE id = ?",
+        (time.time(), entry['id'])
+    )
+
+def _fetch_details(entries, token, resolved, failed):
+    """
+    entries의 주문을 한 번에 조회해 (entry, details)를 resolved에 추가합니다.
+    잘못된 주문 하나 때문에 묶음 전체가 실패했을 수 있으면 주문 번호를 반으로 나눠 다시 조회하고,
+    더 나눌 수 없거나 API 전체의 문제이면 (entries, 오류)를 failed에 추가합니다.
+    """
+    order_numbers = sorted({entry['order_number'] for entry in entries})
+    try:
+        order_data = dell_api.fetch_order_data(order_numbers, token)
+    except dell_api.OrderFetchError as e:
+        if len(order_numbers) > 1 and e.is_order_specific():
+            first_half = set(order_numbers[:len(order_numbers) // 2])
+            logging.info(f"Dell lookup for {len(order_numbers)} orders failed ({e.status_code}); splitting the batch.")
+            _fetch_details([entry for entry in entries if entry['order_number'] in first_half], token, resolved, failed)
+            _fetch_details([entry for entry in entries if entry['order_number'] not in first_half], token, resolved, failed)
+        else:
+            failed.append((entries, e))
+        return
+
+    responses = dell_api.split_order_response(order_data, order_numbers)
+    for entry in entries:
+        resolved.append((entry, dell_api.extract_order_details(entry['order_number'], responses[entry['order_number']])))
+
+def reconcile_batch():
+    """
+    대기 주문 한 묶음을 Dell API로 조회해 반영하고, 처리한 항목 수를 반환합니다.
+    보통은 한 번의 조회로 끝나며, 일부 주문 때문에 실패하면 묶음을 나눠 실패한 주문만 재시도를 예약합니다.
+    """
+    entries = _claim_batch()
+    if not entries:
+        return 0
+
+    try:
+        token = dell_api.get_access_token()
+    except dell_api.DellApiError as e:
+        _mark_failed(entries, e)
+        return len(entries)
+
+    resolved, failed = [], []
+    _fetch_details(entries, token, resolved, failed)
+    if resolved:
+        with get_db_connection() as conn:
+            for entry, details in resolved:
+                _resolve(conn, entry, details)
+            conn.commit()
+        logging.info(f"✅ Resolved {len(resolved)} pending order(s): {sorted({entry['order_number'] for entry, _ in resolved})}")
+    for failed_entries, error in failed:
+        _mark_failed(failed_entries, error)
+    return len(entries)
+
+def get_stats():
+    """상태별 대기 주문 수와 최근 실패 항목."""
+    with get_db_connection() as conn:
+        counts = {row['status']: row['count'] for row in conn.execute(
+            "SELECT status, COUNT(*) AS count FROM pending_orders GROUP BY status"
+        ).fetchall()}
+        failing = [dict(row) for row in conn.execute(
+            '''SELECT order_number, box, reason, status, attempts, last_error, captured_at, next_attempt_at
+               FROM pending_orders WHERE status IN ('pending', 'failed') AND attempts > 0
+               ORDER BY id DESC LIMIT 20'''
+        ).fetchall()]
+    return {"counts": counts, "failing": failing}
+
+def _worker_loop():
+    while True:
+        _wakeup.clear()
+        try:
+            # 한 번에 한 묶음씩, 남은 항목이 없을 때까지 처리합니다.
+            while reconcile_batch():
+                pass
+        except Exception as e:
+            logging.error(f"Pending order reconciliation error: {e}", exc_info=True)
+        _wakeup.wait(config.RECONCILE_INTERVAL_SECONDS)
+
+_worker = background.BackgroundThread("pending-reconciler", _worker_loop)
+
+def ensure_worker_started():
+    """현재 프로세스에서 재조회 스레드가 돌고 있지 않으면 시작합니다 (fork 이후 워커마다 하나씩)."""
+    _worker.ensure_started()
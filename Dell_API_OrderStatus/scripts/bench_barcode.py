@@ -0,0 +1,108 @@
+"""
+바코드 우선 인식 벤치마크.
+
+    python scripts/bench_barcode.py [경로 ...] [--runs 3] [--textract | --textract-ms N]
+
+static/images와 uploads/(또는 지정한 경로)의 이미지마다 로컬 바코드 인식 시간과 결과를 측정하고,
+Textract를 건너뛸 수 있는 박스 라벨(주문 번호 + 박스 순번)의 비율(적중률)과 절약할 수 있는 시간을 출력합니다.
+--textract를 주면 바코드를 못 읽은 이미지에 대해 실제 Textract를 호출해 시간을 재고 (AWS 자격 증명 필요),
+그렇지 않으면 --textract-ms 값(예: 운영 서버 /ocr_stats의 avg_textract_ms)을 사용합니다.
+운영 통계(ocr_stats)에는 기록하지 않습니다.
+"""
+import os
+import sys
+import time
+import argparse
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+import barcode_reader
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff', '.webp')
+DEFAULT_DIRS = [os.path.join(APP_DIR, "static", "images"), os.path.join(APP_DIR, "uploads")]
+
+def find_images(paths):
+    images = []
+    for path in paths:
+        if os.path.isfile(path):
+            images.append(path)
+        elif os.path.isdir(path):
+            images += sorted(os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS))
+    return images
+
+def time_barcode(image_bytes, runs):
+    """가장 빠른 실행 시간(ms), 바코드 값 목록, (주문 번호, 박스 순번, 전체 박스 수)를 반환합니다."""
+    best, payloads, label = None, [], (None, None, None)
+    for _ in range(runs):
+        started = time.perf_counter()
+        payloads = barcode_reader._read_barcodes(image_bytes)
+        label = barcode_reader.parse_label(payloads)
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, payloads, label
+
+def time_textract(image_bytes):
+    import ocr
+    started = time.perf_counter()
+    ocr.get_textract_client().detect_document_text(Document={'Bytes': image_bytes})
+    return (time.perf_counter() - started) * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths", nargs="*", default=DEFAULT_DIRS)
+    parser.add_argument("--runs", type=int, default=3)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--textract", action="store_true", help="바코드를 못 읽은 이미지에 실제 Textract를 호출해 시간 측정")
+    group.add_argument("--textract-ms", type=float, help="Textract 한 번 호출 시간 가정값 (ms)")
+    args = parser.parse_args()
+
+    try:
+        import zxingcpp  # noqa: F401
+        import PIL  # noqa: F401
+    except ImportError:
+        sys.exit("zxing-cpp와 Pillow가 필요합니다: pip install zxing-cpp Pillow")
+
+    images = find_images(args.paths)
+    if not images:
+        sys.exit("이미지를 찾을 수 없습니다.")
+
+    hits, barcode_total_ms, textract_samples = 0, 0.0, []
+    print(f"{'image':<50}{'barcode':>10}{'textract':>11}  result")
+    for path in images:
+        with open(path, 'rb') as f:
+            image_bytes = f.read()
+        barcode_ms, payloads, (order_number, box_index, box) = time_barcode(image_bytes, args.runs)
+        barcode_total_ms += barcode_ms
+        textract_ms = None
+        if order_number and box_index is not None:
+            hits += 1
+            result = f"order {order_number} box {box_index}/{box}"
+        else:
+            found = f"order {order_number} without box" if order_number else "miss"
+            result = f"{found} ({len(payloads)} barcode(s): {', '.join(payloads[:3]) or '-'})"
+            if args.textract:
+                textract_ms = time_textract(image_bytes)
+                textract_samples.append(textract_ms)
+        textract_col = f"{textract_ms:>9.0f}ms" if textract_ms is not None else f"{'-':>11}"
+        name = os.path.relpath(path, APP_DIR) if path.startswith(APP_DIR) else path
+        print(f"{name:<50}{barcode_ms:>8.1f}ms{textract_col}  {result}")
+
+    if textract_samples:
+        avg_textract_ms, source = sum(textract_samples) / len(textract_samples), "measured"
+    else:
+        avg_textract_ms, source = args.textract_ms, "given"
+
+    print()
+    print(f"images: {len(images)}, barcode hits: {hits} ({hits / len(images):.0%}), "
+          f"avg barcode decode: {barcode_total_ms / len(images):.1f}ms")
+    if avg_textract_ms is None:
+        print("Textract 평균 시간을 알 수 없어 절약 시간은 계산하지 않았습니다 (--textract 또는 --textract-ms 사용).")
+    else:
+        saved = hits * avg_textract_ms - barcode_total_ms
+        print(f"avg Textract call: {avg_textract_ms:.0f}ms ({source}); "
+              f"Textract calls avoided: {hits}; estimated net time saved: {saved:.0f}ms "
+              f"({saved / len(images):.0f}ms per image)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+주문 그룹화 성능 비교 (Python 그룹화 vs SQLite json_group_array 그룹화).
+
+    python scripts/bench_grouping.py [--rows 100000] [--archive]
+
+임시 DB에 가짜 주문 데이터를 만들고, 기존 방식(전체 행 조회 → dict 복사 → Python에서 그룹화)과
+DB 그룹화 방식(get_grouped_orders)의 전체 조회 / 한 페이지 조회 시간을 비교합니다. 실제 orders.db는 건드리지 않습니다.
+--archive를 주면 ARCHIVE_CUTOFF 이전의 출고 행을 임시 보관 DB로 옮긴 뒤, 보관 DB를 포함한 조회(/search_all 등)를 비교합니다.
+"""
+import os
+import sys
+import time
+import random
+import datetime
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import archive
+import database
+import migrations
+
+# --archive에서 이 날짜 이전의 출고 행을 보관 DB로 옮깁니다 (가짜 데이터는 2023-01-01부터 약 1000일).
+ARCHIVE_CUTOFF = "2024-06-01"
+
+def populate(rows):
+    random.seed(42)
+    start = datetime.date(2023, 1, 1)
+    data = []
+    order_number = 1010000000
+    while len(data) < rows:
+        order_number += 1
+        created_at = (start + datetime.timedelta(days=random.randint(0, 1000))).strftime('%Y-%m-%d')
+        po = f"OH-{random.randint(2301, 2512)}-TEST"
+        shipped = random.randint(0, 1)
+        for line in range(random.randint(1, 6)):
+            data.append((str(order_number), po, f"PowerEdge R{random.randint(600, 800)} 부품 {line}",
+                         random.randint(1, 8), str(random.randint(1, 5)), created_at, shipped))
+    with database.get_db_connection() as conn:
+        conn.executemany(
+            "INSERT INTO orders (order_number, purchase_order_number, product_description, quantity, box, created_at, shipped) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            data[:rows]
+        )
+        conn.commit()
+
+def legacy_group(query="", params=(), include_archive=False):
+    """기존 방식: SELECT * → dict(row) → Python 그룹화 (app._group_orders와 동일). include_archive이면 보관 DB 행도 합칩니다."""
+    if include_archive:
+        sql = f'''SELECT * FROM (SELECT {database.ORDER_COLUMNS}, pending FROM main.orders {query}
+                                 UNION ALL SELECT {database.ORDER_COLUMNS}, 0 AS pending FROM archive.orders {query})
+                  ORDER BY created_at DESC, id DESC'''
+        params = list(params) * 2
+    else:
+        sql = f"SELECT * FROM orders {query} ORDER BY created_at DESC, id DESC"
+    with database.get_db_connection(include_archive=include_archive) as conn:
+        rows = [dict(row) for row in conn.execute(sql, params).fetchall()]
+    grouped = {}
+    for row in rows:
+        row_dict = dict(row)
+        order_num = row_dict['order_number']
+        if order_num not in grouped:
+            grouped[order_num] = {
+                "order_number": order_num,
+                "purchase_order_number": row_dict['purchase_order_number'],
+                "created_at": row_dict['created_at'],
+                "shipped": row_dict['shipped'],
+                "memo": row_dict['memo'],
+                "box": row_dict['box'],
+                "pending": row_dict['pending'],
+                "products": []
+            }
+        grouped[order_num]['products'].append({"description": row_dict['product_description'], "itemQuantity": row_dict['quantity']})
+    return list(grouped.values())
+
+def timed(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--archive", action="store_true", help="오래된 출고 행을 보관 DB로 옮긴 뒤 보관 DB 포함 조회를 비교")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = config.DB_PATH = os.path.join(tmp, "bench.db")
+        migrations.run_migrations()
+        populate(args.rows)
+        per_page = config.ITEMS_PER_PAGE
+        include_archive = args.archive
+        if include_archive:
+            database.ARCHIVE_DB_PATH = config.ARCHIVE_DB_PATH = os.path.join(tmp, "bench_archive.db")
+            archived = archive.run_archive(ARCHIVE_CUTOFF, pause_seconds=0)
+            print(f"archived {archived} shipped row(s) older than {ARCHIVE_CUTOFF}")
+
+        cases = [
+            ("전체 조회 (/search_all)", "", ()),
+            ("날짜 범위 (/order_list, 1주)", "WHERE DATE(created_at) BETWEEN DATE(?) AND DATE(?)", ("2024-01-07", "2024-01-13")),
+            ("미출고 (/search_unshipped)", "WHERE shipped = 0", ()),
+            ("검색 (/search, LIKE)", "WHERE product_description LIKE ?", ("%R7%",)),
+        ]
+        print(f"rows={args.rows}{' (hot + archive)' if include_archive else ''}")
+        print(f"{'case':<32}{'legacy all':>12}{'sql all':>12}{'legacy page':>13}{'sql page':>12}")
+        for name, query, params in cases:
+            legacy_time, legacy = timed(lambda: legacy_group(query, params, include_archive))
+            sql_time, grouped = timed(lambda: database.get_grouped_orders(query, params, include_archive=include_archive))
+            assert legacy == grouped, f"결과 불일치: {name}"
+            # 페이지 조회: 기존 방식은 전체를 그룹화한 뒤 잘라냈습니다.
+            legacy_page_time, legacy_page = timed(lambda: legacy_group(query, params, include_archive)[per_page:per_page * 2])
+            sql_page_time, (_, sql_page) = timed(lambda: (
+                database.count_grouped_orders(query, params, include_archive=include_archive),
+                database.get_grouped_orders(query, params, limit=per_page, offset=per_page, include_archive=include_archive)))
+            assert legacy_page == sql_page, f"페이지 결과 불일치: {name}"
+            print(f"{name:<32}{legacy_time * 1000:>10.0f}ms{sql_time * 1000:>10.0f}ms"
+                  f"{legacy_page_time * 1000:>11.0f}ms{sql_page_time * 1000:>10.0f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+출고 이력 보관(archive) 확인 스크립트.
+
+    python scripts/check_archive.py [--rows 5000]
+
+임시 DB에 가짜 주문을 만들고, 오래된 출고 행을 보관 DB로 옮기기 전과 후의 조회 응답(HTML 페이지, JSON API)이
+바이트 단위로 같은지 확인합니다. 실제 orders.db는 건드리지 않습니다.
+"""
+import os
+import sys
+import argparse
+import tempfile
+import contextlib
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPTS_DIR))
+sys.path.insert(0, SCRIPTS_DIR)
+
+import config
+import archive
+import database
+import migrations
+from bench_grouping import populate, ARCHIVE_CUTOFF
+
+# 보관 DB를 함께 조회하는 화면과 API
+URLS = [
+    "/search_all", "/search_all?page=2", "/search_all?page=7",
+    "/search_shipped", "/search_shipped?page=3",
+    "/search?field=product_description&value=R7&page=2",
+    "/search?field=order_number&value=1010000",
+    "/api/orders?limit=50",
+    "/api/orders?fields=header&limit=200",
+    "/api/orders?field=purchase_order_number&value=OH-23&limit=100",
+    "/api/orders?start_date=2023-01-01&end_date=2023-06-30&limit=200",
+]
+
+def check(condition, message):
+    print(f"{'OK  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        sys.exit(1)
+
+def snapshot(client):
+    """각 URL의 응답과, API는 next_cursor를 따라간 모든 페이지의 응답을 모읍니다."""
+    bodies = {}
+    for url in URLS:
+        response = client.get(url)
+        check(response.status_code == 200, f"{url} 200")
+        bodies[url] = response.get_data()
+        if url.startswith("/api/"):
+            cursor, pages = response.get_json()["next_cursor"], 1
+            while cursor:
+                page_url = f"{url}&cursor={cursor}"
+                response = client.get(page_url)
+                bodies[page_url] = response.get_data()
+                cursor, pages = response.get_json()["next_cursor"], pages + 1
+    return bodies
+
+class _UnshipAfterCopy:
+    """보관 작업의 복사 커밋 직후(삭제 전)에 주문을 출고 취소하는 연결 래퍼."""
+    def __init__(self, conn, order_number, client):
+        self._conn, self._order_number, self._client = conn, order_number, client
+        self._copied = False
+
+    def execute(self, sql, *args):
+        if sql.lstrip().startswith("INSERT OR IGNORE INTO archive.orders") and self._order_number:
+            self._copied = True
+        return self._conn.execute(sql, *args)
+
+    def commit(self):
+        self._conn.commit()
+        if self._copied:
+            self._copied = False
+            order_number, self._order_number = self._order_number, None
+            self._client.post("/update_shipped_status", data={"order_number": order_number, "shipped": "false"})
+
+def check_unship_race(client, order_number):
+    """복사와 삭제 사이에 출고 취소된 주문이 orders에 미출고로 남고, 보관 DB에 사본이 남지 않는지 확인합니다."""
+    with database.get_db_connection() as conn:
+        conn.executemany(
+            "INSERT INTO orders (order_number, purchase_order_number, product_description, quantity, box, created_at, shipped) VALUES (?, ?, ?, ?, ?, ?, 1)",
+            [(order_number, "OH-RACE", f"race line {n}", 1, "1", "2023-01-02") for n in range(3)]
+        )
+        conn.commit()
+
+    original = archive.get_db_connection
+    @contextlib.contextmanager
+    def racing_connection(include_archive=False):
+        with original(include_archive=include_archive) as conn:
+            yield _UnshipAfterCopy(conn, order_number, client)
+    archive.get_db_connection = racing_connection
+    try:
+        archive.run_archive(ARCHIVE_CUTOFF, pause_seconds=0)
+    finally:
+        archive.get_db_connection = original
+
+    with database.get_db_connection(include_archive=True) as conn:
+        hot = conn.execute("SELECT shipped FROM main.orders WHERE order_number = ?", (order_number,)).fetchall()
+        archived = conn.execute("SELECT COUNT(*) FROM archive.orders WHERE order_number = ?", (order_number,)).fetchone()[0]
+    check(len(hot) == 3 and all(row[0] == 0 for row in hot), "복사 후 출고 취소된 행이 orders에 미출고로 남음")
+    check(archived == 0, "출고 취소된 주문의 보관 사본이 삭제됨")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = config.DB_PATH = os.path.join(tmp, "orders.db")
+        database.ARCHIVE_DB_PATH = config.ARCHIVE_DB_PATH = os.path.join(tmp, "orders_archive.db")
+        config.ARCHIVE_INTERVAL_SECONDS = 0
+        migrations.run_migrations()
+        populate(args.rows)
+
+        from app import create_app
+        client = create_app().test_client()
+
+        before = snapshot(client)
+        archived = archive.run_archive(ARCHIVE_CUTOFF, pause_seconds=0)
+        check(archived > 0, f"{archived}개 출고 행을 보관 DB로 이동")
+        after = snapshot(client)
+
+        check(before.keys() == after.keys(), f"API 페이지 수 동일 ({len(before)}개 응답)")
+        different = [url for url in before if before[url] != after[url]]
+        check(not different, f"보관 전후 응답이 바이트 단위로 동일 {different or ''}")
+
+        check_unship_race(client, "1099999999")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+바코드 라벨 해석 확인 스크립트.
+
+    python scripts/check_barcode.py
+
+Dell 박스 라벨(static/images/box_label_example.png)의 바코드 값 "003500031014749359058"과
+다른 형식의 바코드 값이 (주문 번호, 박스 순번, 전체 박스 수)로 올바르게 해석되는지 확인합니다.
+예제 사진은 해상도가 낮아 바코드를 직접 읽을 수 없으므로, 같은 값으로 만든 Code 128 이미지로 decode_label도 확인합니다.
+"""
+import io
+import os
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPTS_DIR))
+
+import barcode_reader
+
+DELL_LABEL_PAYLOAD = "003500031014749359058"
+
+CASES = [
+    ([DELL_LABEL_PAYLOAD], ("1014749359", 3, 58), "Dell 박스 라벨: 박스 003 / 주문 1014749359 / 전체 058"),
+    (["001123451013422110001"], ("1013422110", 1, 1), "Dell 박스 라벨: 1개 중 1번째"),
+    (["060500031014749359058"], ("1014749359", None, None), "박스 순번이 전체보다 크면 주문 번호만"),
+    (["003500031014749359000"], ("1014749359", None, None), "전체 박스 수가 0이면 주문 번호만"),
+    ([DELL_LABEL_PAYLOAD, "001500031013422110002"], (None, None, None), "서로 다른 Dell 라벨이 여러 개면 인식하지 않음"),
+    (["1013422110", "1 OF 3"], ("1013422110", 1, 3), "주문 번호 + 박스 순번 바코드"),
+    (["KR-1013422110", "03/05"], ("1013422110", None, None), "날짜(03/05)는 박스 순번으로 보지 않음"),
+    (["ORDER# 1013422110 1016031605"], (None, None, None), "납품확인서는 Textract로 처리"),
+    (["0035000310147493590589"], (None, None, None), "22자리 값은 Dell 라벨이 아님"),
+]
+
+def check(condition, message):
+    print(f"{'OK  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        sys.exit(1)
+
+def main():
+    for payloads, expected, message in CASES:
+        result = barcode_reader.parse_label(payloads)
+        check(result == expected, f"{message}: {result}")
+
+    try:
+        import zxingcpp
+        from PIL import Image
+    except ImportError:
+        print("SKIP zxing-cpp/Pillow가 없어 이미지 인식은 확인하지 않습니다.")
+        return
+    # 통계(ocr_stats)에는 기록하지 않습니다.
+    barcode_reader.record = lambda name, elapsed_ms: None
+    barcode = zxingcpp.create_barcode(DELL_LABEL_PAYLOAD, zxingcpp.BarcodeFormat.Code128)
+    buffer = io.BytesIO()
+    Image.fromarray(barcode.to_image(scale=3)).save(buffer, format="PNG")
+    result = barcode_reader.decode_label(buffer.getvalue(), "generated Code 128")
+    check(result == {"order_number": "1014749359", "box": 58, "box_index": 3},
+          f"Code 128 이미지에서 Textract 없이 박스 라벨 인식: {result}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+관리자 호출 outbox 확인 스크립트.
+
+    python scripts/check_notifier.py
+
+임시 DB와 로컬 SMTP 테스트 서버(smtp_stub.py)로 다음을 확인합니다. 실제 orders.db와 메일 서버는 건드리지 않습니다.
+- 발송 전 같은 스테이션의 연속 호출은 메일 한 통으로 합쳐지고, 메일에 추가 호출 횟수가 표시됩니다.
+- 이미 발송된 메일에는 합치지 않고 새 메일을 만듭니다.
+- 여러 메일을 SMTP 연결 하나로 보냅니다.
+"""
+import os
+import sys
+import tempfile
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPTS_DIR))
+sys.path.insert(0, SCRIPTS_DIR)
+
+import config
+import database
+import migrations
+import notifier
+from smtp_stub import SmtpStub
+
+def check(condition, message):
+    print(f"{'OK  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        sys.exit(1)
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp, SmtpStub(port=0) as server:
+        database.DB_PATH = config.DB_PATH = os.path.join(tmp, "notifier.db")
+        migrations.run_migrations()
+        config.SMTP_HOST, config.SMTP_PORT = server.start()
+        config.SMTP_USE_SSL = False
+        config.SENDER_PASSWORD = None
+        config.SENDER_EMAIL = config.SENDER_EMAIL or "scanner@example.com"
+        config.ADMIN_EMAIL = config.ADMIN_EMAIL or "admin@example.com"
+        # 발송은 아래에서 drain_outbox로 직접 실행합니다.
+        notifier.ensure_sender_started = lambda: None
+        smtp = notifier._SmtpConnection()
+
+        results = [notifier.enqueue_admin_call("10.0.0.5") for _ in range(3)]
+        check(len({notification_id for notification_id, _ in results}) == 1, "발송 전 연속 호출 3회가 한 항목으로 합쳐짐")
+        check([coalesced for _, coalesced in results] == [False, True, True], "두 번째 호출부터 coalesced로 표시됨")
+
+        check(notifier.drain_outbox(smtp) == 1 and len(server.messages) == 1, "메일 한 통 발송")
+        check("2회 추가 호출" in server.messages[0].get_content(), "메일에 추가 호출 횟수 표시")
+
+        notification_id, coalesced = notifier.enqueue_admin_call("10.0.0.5")
+        check(not coalesced and notification_id != results[0][0], "발송된 메일에는 합치지 않고 새 항목 생성")
+        notifier.drain_outbox(smtp)
+        check(len(server.messages) == 2, "새 호출도 메일로 발송")
+        check(server.connections == 1, "SMTP 연결 하나를 재사용")
+        smtp.close()
+
+        with database.get_db_connection() as conn:
+            statuses = [row[0] for row in conn.execute("SELECT status FROM notifications_outbox ORDER BY id")]
+        check(statuses == ['sent', 'sent'], "outbox 항목이 모두 sent 상태")
+
+if __name__ == "__main__":
+    main()
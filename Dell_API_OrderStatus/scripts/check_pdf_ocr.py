@@ -0,0 +1,69 @@
+"""
+PDF 납품확인서 OCR 재생 확인 스크립트.
+
+    python scripts/check_pdf_ocr.py
+
+scripts/fixtures/pdf_ocr의 3페이지 PDF를 녹화된 Textract 응답(OCR_FIXTURE_MODE=replay)으로 처리하고,
+페이지별 결과가 합쳐지며 중복이 제거되는지 확인합니다. AWS는 호출하지 않습니다.
+"""
+import os
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPTS_DIR))
+
+import config
+import ocr
+
+FIXTURE_DIR = os.path.join(SCRIPTS_DIR, "fixtures", "pdf_ocr")
+PDF_PATH = os.path.join(FIXTURE_DIR, "delivery_confirmation_3p.pdf")
+
+# 페이지별 인식 결과: 1013422110은 1·2페이지, 1016031605는 2·3페이지에 중복되고,
+# 1015000001은 1페이지에서 박스 없이, 2페이지에서 Box 3으로 인식됩니다.
+EXPECTED = [
+    ("1014749359", "1"),
+    ("1013422110", "2"),
+    ("1015000001", "3"),
+    ("1016031605", "1"),
+    ("1017777777", "4"),
+]
+
+def check(condition, message):
+    print(f"{'OK  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        sys.exit(1)
+
+def _no_aws():
+    raise AssertionError("재생 모드에서 Textract 클라이언트를 만들면 안 됩니다")
+
+def main():
+    config.OCR_FIXTURE_MODE = "replay"
+    config.OCR_FIXTURE_DIR = FIXTURE_DIR
+    ocr.get_textract_client = _no_aws
+
+    with open(PDF_PATH, 'rb') as f:
+        pages = ocr.split_pdf_pages(f.read())
+    check(len(pages) == 3, "PDF를 3페이지로 분할")
+
+    results = ocr.extract_order_details_from_pdf(PDF_PATH)
+    errors = [result['error'] for result in results if result.get('error')]
+    check(not errors, f"모든 페이지의 fixture 재생 성공 {errors or ''}")
+
+    found = [(result['order_number'], result['box']) for result in results]
+    check(len(found) == len(set(found)), "페이지 간 중복 주문 제거")
+    check(("1015000001", None) not in found, "박스 번호가 인식된 주문의 박스 없는 결과 제거")
+    check(found == EXPECTED, f"합친 결과가 페이지 순서대로 {len(EXPECTED)}건: {found}")
+
+    config.OCR_PDF_MAX_PAGES = 2
+    results = ocr.extract_order_details_from_pdf(PDF_PATH)
+    check(len(results) == 1 and "최대 2페이지" in results[0].get('error', ''),
+          f"OCR_PDF_MAX_PAGES를 넘는 PDF는 OCR 전에 거절: {results[0].get('error')}")
+    config.OCR_PDF_MAX_PAGES = 3
+
+    config.OCR_FIXTURE_DIR = os.path.join(FIXTURE_DIR, "missing")
+    results = ocr.extract_order_details_from_pdf(PDF_PATH)
+    check(len(results) == 3 and all("fixture" in result.get('error', '') for result in results),
+          "fixture가 없는 페이지는 페이지 번호와 함께 오류로 보고")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Dell 조회 대기 주문 재조회 확인 스크립트.
+
+    python scripts/check_reconcile.py
+
+임시 DB와 가짜 Dell API로 다음을 확인합니다. 실제 orders.db와 Dell API는 건드리지 않습니다.
+- 정상이면 대기 주문 한 묶음을 한 번의 조회로 처리합니다.
+- 잘못된 주문 하나 때문에 묶음 조회가 실패하면 묶음을 나눠 다시 조회하고, 그 주문만 재시도를 예약합니다.
+- 게이트웨이 오류처럼 API 전체의 문제이면 나누지 않고 묶음 전체의 재시도를 예약합니다.
+"""
+import os
+import sys
+import tempfile
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPTS_DIR))
+
+import config
+import database
+import migrations
+import dell_api
+import reconcile
+
+BAD_ORDER = "1019999999"
+
+def check(condition, message):
+    print(f"{'OK  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        sys.exit(1)
+
+class FakeDellApi:
+    """요청에 BAD_ORDER가 있으면 400, outage이면 503으로 실패하는 주문 조회."""
+
+    def __init__(self):
+        self.calls = []
+        self.outage = False
+
+    def fetch_order_data(self, order_numbers, access_token):
+        self.calls.append(list(order_numbers))
+        if self.outage:
+            raise dell_api.OrderFetchError("gateway timeout", 503)
+        if BAD_ORDER in order_numbers:
+            raise dell_api.OrderFetchError(f"bad order in {order_numbers}", 400)
+        return {"purchaseOrderDetails": [
+            {"purchaseOrderNumber": f"PO-{order_number}",
+             "dellOrders": [{"orderNumber": order_number, "productInfo": [{"description": "PowerEdge R760", "itemQuantity": 1}]}]}
+            for order_number in order_numbers
+        ]}
+
+def capture(order_numbers):
+    reconcile.capture_orders([reconcile.pending_order_details(order_number, "1", "forced") for order_number in order_numbers])
+
+def statuses():
+    with database.get_db_connection() as conn:
+        return {row['order_number']: row['status'] for row in conn.execute("SELECT order_number, status FROM pending_orders")}
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = config.DB_PATH = os.path.join(tmp, "reconcile.db")
+        migrations.run_migrations()
+        # 재조회는 아래에서 reconcile_batch로 직접 실행합니다.
+        reconcile.ensure_worker_started = lambda: None
+        api = FakeDellApi()
+        dell_api.fetch_order_data = api.fetch_order_data
+        dell_api.get_access_token = lambda: "token"
+
+        good = [f"10100000{n:02d}" for n in range(1, 8)]
+        capture(good)
+        reconcile.reconcile_batch()
+        check(len(api.calls) == 1 and all(status == 'resolved' for status in statuses().values()),
+              f"대기 주문 {len(good)}건을 조회 한 번으로 처리")
+
+        more = [f"10110000{n:02d}" for n in range(1, 8)]
+        capture(more + [BAD_ORDER])
+        api.calls.clear()
+        reconcile.reconcile_batch()
+        current = statuses()
+        check(all(current[order_number] == 'resolved' for order_number in more), "잘못된 주문과 같은 묶음의 다른 주문은 처리됨")
+        check(current[BAD_ORDER] == 'pending', "잘못된 주문만 재시도 예약")
+        check(api.calls[-1] == [BAD_ORDER] and len(api.calls) <= 7,
+              f"묶음을 반씩 나눠 잘못된 주문을 찾음 (조회 {len(api.calls)}회)")
+
+        with database.get_db_connection() as conn:
+            conn.execute("UPDATE pending_orders SET next_attempt_at = 0 WHERE order_number = ?", (BAD_ORDER,))
+            conn.commit()
+        outage = [f"10120000{n:02d}" for n in range(1, 5)]
+        capture(outage)
+        api.calls.clear()
+        api.outage = True
+        reconcile.reconcile_batch()
+        current = statuses()
+        check(len(api.calls) == 1, "API 장애(503)에는 묶음을 나누지 않음")
+        check(all(current[order_number] == 'pending' for order_number in outage + [BAD_ORDER]), "묶음 전체 재시도 예약")
+
+if __name__ == "__main__":
+    main()
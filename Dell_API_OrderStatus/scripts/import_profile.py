@@ -0,0 +1,57 @@
+"""
+앱 시작(import) 시간 프로파일 리포트.
+
+    python scripts/import_profile.py [모듈명] [--top N] [--runs N]
+
+`python -X importtime`으로 모듈을 새 프로세스에서 여러 번 import하여,
+전체 시작 시간(중앙값)과 누적 시간이 가장 큰 모듈 목록을 출력합니다.
+"""
+import os
+import re
+import statistics
+import subprocess
+import sys
+import argparse
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+def profile_once(module):
+    """모듈을 새 인터프리터에서 import하고 (모듈명, 자체 시간 us, 누적 시간 us, 깊이) 목록을 반환합니다."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"'{module}' import 실패:\n{result.stderr[-2000:]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return entries
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time profile report")
+    parser.add_argument("module", nargs="?", default="app")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [profile_once(args.module) for _ in range(args.runs)]
+    totals = [next(cum for name, _, cum, _ in entries if name == args.module) for entries in runs]
+    print(f"'{args.module}' import 시간 (중앙값, {args.runs}회): {statistics.median(totals) / 1000:.1f} ms")
+
+    # 마지막 실행 기준, 앱 모듈의 직접 의존성 중 누적 시간이 큰 순서로 출력
+    last = runs[-1]
+    top_level = sorted((e for e in last if e[3] == 1), key=lambda e: e[2], reverse=True)
+    print(f"\n{'module':<40}{'cumulative(ms)':>16}{'self(ms)':>12}")
+    for name, self_us, cumulative_us, _ in top_level[:args.top]:
+        print(f"{name:<40}{cumulative_us / 1000:>16.1f}{self_us / 1000:>12.1f}")
+
+    heavy = [name for name in ("boto3", "botocore", "requests", "smtplib") if any(e[0] == name for e in last)]
+    print(f"\n시작 시 로드된 무거운 의존성: {', '.join(heavy) if heavy else '없음'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+로컬 SMTP 테스트 서버 (표준 라이브러리만 사용, Python 3.12에서 제거된 smtpd 대체).
+
+    python scripts/smtp_stub.py [--port 1025]
+
+받은 메일을 실제로 보내지 않고 제목과 본문을 출력합니다. 앱은 다음 설정으로 연결합니다:
+SMTP_HOST=localhost SMTP_PORT=1025 SMTP_USE_SSL=false
+"""
+import argparse
+import threading
+import socketserver
+from email import message_from_bytes, policy
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    """메일 발송에 필요한 최소한의 명령(EHLO/HELO, NOOP, MAIL, RCPT, DATA, RSET, QUIT)만 처리합니다."""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.reply("220 smtp-stub ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().split(' ', 1)[0].upper()
+            if command in ("EHLO", "HELO"):
+                self.reply("250 smtp-stub")
+            elif command in ("NOOP", "MAIL", "RCPT", "RSET"):
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                for data_line in iter(self.rfile.readline, b''):
+                    if data_line in (b".\r\n", b".\n"):
+                        break
+                    data.append(data_line[1:] if data_line.startswith(b"..") else data_line)
+                self.server.deliver(message_from_bytes(b"".join(data), policy=policy.default))
+                self.reply("250 OK: queued")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+class SmtpStub(socketserver.ThreadingTCPServer):
+    """받은 메일을 messages 목록에 모아 둡니다. verbose이면 받은 메일을 출력합니다."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="localhost", port=1025, verbose=False):
+        super().__init__((host, port), _SmtpHandler)
+        self.messages = []
+        self.connections = 0
+        self.verbose = verbose
+        self._lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+    def deliver(self, msg):
+        with self._lock:
+            self.messages.append(msg)
+        if self.verbose:
+            print(f"---------- {msg['Subject']} → {msg['To']}")
+            print(msg.get_content())
+
+    def start(self):
+        """백그라운드 스레드에서 서버를 실행하고 (host, port)를 반환합니다."""
+        threading.Thread(target=self.serve_forever, name="smtp-stub", daemon=True).start()
+        return self.server_address
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args()
+    with SmtpStub(args.host, args.port, verbose=True) as server:
+        print(f"SMTP stub listening on {args.host}:{args.port}")
+        server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+"""
+운영 환경용 WSGI 진입점.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+gunicorn.conf.py가 워커를 fork하기 전에 마스터 프로세스에서 DB 마이그레이션을 한 번 실행하고,
+각 워커는 fork 이후에 이 모듈을 import하여 자신만의 앱 객체를 생성합니다.
+"""
+from app import create_app
+
+app = create_app()